@@ -0,0 +1,122 @@
+"""
+Document building benchmark, comparing `edapi.document.DocumentBuilder`
+with building a BeautifulSoup tree through `edapi.utils.new_document`.
+
+Both build the same document (a heading, a nested list of links and a figure,
+similar to the example scripts), keeping the best of several runs; the script
+exits with a non-zero status if the builder is not at least `--min-speedup`
+times faster, or if the two documents differ.
+
+Usage:
+    python benchmarks/document_builder.py [--documents N] [--runs N] [--min-speedup X]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from edapi.document import DocumentBuilder
+from edapi.utils import new_document, parse_content
+
+# number of list items in each document
+ITEMS = 20
+
+
+def build_with_bs4() -> str:
+    """
+    Build the document through a BeautifulSoup tree.
+    """
+    soup, document = new_document()
+    heading = soup.new_tag("heading", level=2)
+    heading.string = "Homework 1"
+    document.append(heading)
+
+    question_list = soup.new_tag("list", style="bullet")
+    for i in range(ITEMS):
+        item = soup.new_tag("list-item")
+        paragraph = soup.new_tag("paragraph")
+        paragraph.append(f"Question {i} ")
+        link = soup.new_tag("link", href=f"https://example.com/q{i}?a=1&b=2")
+        link.string = f"#{i}"
+        paragraph.append(link)
+        item.append(paragraph)
+        question_list.append(item)
+    document.append(question_list)
+
+    figure = soup.new_tag("figure")
+    figure.append(
+        soup.new_tag("image", src="https://example.com/a.png", width=640, height=480)
+    )
+    document.append(figure)
+    return str(document)
+
+
+def build_with_builder() -> str:
+    """
+    Build the document through a DocumentBuilder.
+    """
+    doc = DocumentBuilder()
+    doc.heading("Homework 1", level=2)
+    with doc.list("bullet"):
+        for i in range(ITEMS):
+            with doc.list_item(), doc.paragraph():
+                doc.text(f"Question {i} ")
+                doc.link(f"https://example.com/q{i}?a=1&b=2", f"#{i}")
+    with doc.figure():
+        doc.image("https://example.com/a.png", 640, 480)
+    return doc.build()
+
+
+def best_time(func, documents: int, runs: int) -> float:
+    """
+    Best time (in seconds) to build the given number of documents over several runs.
+    """
+    return min(timeit.repeat(func, number=documents, repeat=runs))
+
+
+def main(args):
+    """
+    Run the benchmark, printing the results.
+    """
+    # both documents must parse to the same tree
+    same = str(parse_content(build_with_bs4())[1]) == str(
+        parse_content(build_with_builder())[1]
+    )
+
+    bs4_time = best_time(build_with_bs4, args.documents, args.runs)
+    builder_time = best_time(build_with_builder, args.documents, args.runs)
+    speedup = bs4_time / builder_time
+
+    per_document = lambda seconds: f"{seconds / args.documents * 1e6:.0f} us/document"
+    print(f"bs4: {per_document(bs4_time)}")
+    print(f"DocumentBuilder: {per_document(builder_time)}")
+
+    ok = speedup >= args.min_speedup
+    print(
+        f"[{'ok' if ok else 'FAIL'}] speedup: {speedup:.1f}x,"
+        f" minimum {args.min_speedup:.1f}x"
+    )
+    print(f"[{'ok' if same else 'FAIL'}] documents are {'' if same else 'not '}equal")
+
+    sys.exit(0 if ok and same else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--documents", type=int, default=200, help="number of documents per run"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="number of runs to take the best of"
+    )
+    parser.add_argument(
+        "--min-speedup",
+        type=float,
+        default=5.0,
+        help="minimum speedup of the builder over bs4",
+    )
+    main(parser.parse_args())
@@ -0,0 +1,124 @@
+"""
+Import-time benchmark for the edapi package.
+
+Each import statement is run in a fresh interpreter with `-X importtime`,
+keeping the best of several runs; the script exits with a non-zero status
+if any import exceeds its budget, or if `import edapi` loads a heavy dependency.
+
+Usage:
+    python benchmarks/import_time.py [--runs N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (statement, budget in microseconds, preloaded modules)
+# preloaded modules are imported before the statement and are not counted,
+# so that the check does not depend on how fast required dependencies import
+BUDGETS = [
+    ("import edapi", 5_000, []),
+    ("from edapi import EdAPI", 30_000, ["requests"]),
+    ("import edapi.utils", 5_000, []),
+]
+
+# modules that must not be loaded by `import edapi` or `from edapi import EdAPI`
+LAZY_MODULES = ["bs4", "dotenv", "edapi.types.api_types"]
+
+
+def _top_level_imports(statement: str) -> dict[str, int]:
+    """
+    Cumulative import time (in microseconds) of each top-level import
+    made when running the statement in a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def import_time(statement: str, preload: list[str], runs: int) -> int:
+    """
+    Best import time (in microseconds) of the statement over several runs,
+    excluding the modules imported on interpreter startup or preloaded.
+    """
+    preload_statement = "".join(f"import {module}\n" for module in preload)
+    excluded_modules = set(_top_level_imports(preload_statement or "pass"))
+    best = None
+    for _ in range(runs):
+        imports = _top_level_imports(preload_statement + statement)
+        total = sum(
+            elapsed for name, elapsed in imports.items() if name not in excluded_modules
+        )
+        best = total if best is None else min(best, total)
+    assert best is not None
+    return best
+
+
+def loaded_modules(statement: str) -> list[str]:
+    """
+    Modules loaded after running the statement, among the lazily loaded modules.
+    """
+    check = (
+        f"{statement}\n"
+        "import sys\n"
+        f"print(' '.join(m for m in sys.modules if m.startswith({tuple(LAZY_MODULES)!r})))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.split()
+
+
+def main(args):
+    """
+    Run the benchmark, printing the results.
+    """
+    failed = False
+
+    for statement, budget, preload in BUDGETS:
+        elapsed = import_time(statement, preload, args.runs)
+        allowed = budget
+        detail = f"budget {allowed} us"
+        if preload:
+            detail += f", excluding {', '.join(preload)}"
+
+        ok = elapsed <= allowed
+        failed = failed or not ok
+        print(f"[{'ok' if ok else 'FAIL'}] {statement}: {elapsed} us, {detail}")
+
+    for statement in ("import edapi", "from edapi import EdAPI"):
+        loaded = loaded_modules(statement)
+        failed = failed or bool(loaded)
+        status = "FAIL" if loaded else "ok"
+        print(
+            f"[{status}] {statement}: eagerly loaded {', '.join(loaded) or 'nothing'}"
+        )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--runs", type=int, default=5, help="number of runs to take the best of"
+    )
+    main(parser.parse_args())
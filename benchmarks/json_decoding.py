@@ -0,0 +1,123 @@
+"""
+JSON decoding benchmark, comparing the decoders of `edapi.decoding`
+on a large `list_threads` response.
+
+Each decoder decodes the response, keeping the best of several runs;
+the script exits with a non-zero status if the orjson and msgspec decoders
+are not at least `--min-speedup` times faster than the standard library,
+if the decoders disagree on the result, or if the msgspec decoder doesn't reject
+a response with a missing field.
+
+Usage:
+    python benchmarks/json_decoding.py [--threads N] [--runs N] [--min-speedup X]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from models_memory import make_threads
+
+from edapi.decoding import get_decoder
+from edapi.types import EdError
+
+RESPONSE_TYPE = "threads.API_ListThreads_Response"
+
+
+def make_response(threads: int) -> bytes:
+    """
+    Body of a `list_threads` response with the given number of threads.
+    """
+    thread_list = json.loads(make_threads(threads, max(threads // 25, 1)))
+    users = list(
+        {thread["user"]["id"]: thread["user"] for thread in thread_list}.values()
+    )
+    return json.dumps({"sort_key": "", "threads": thread_list, "users": users}).encode()
+
+
+def retained_size(decode) -> int:
+    """
+    Memory held by the result of `decode()`, in bytes.
+    """
+    tracemalloc.start()
+    try:
+        result = decode()
+        size = tracemalloc.get_traced_memory()[0]
+        del result
+        return size
+    finally:
+        tracemalloc.stop()
+
+
+def main(args):
+    """
+    Run the benchmark, printing the results.
+    """
+    content = make_response(args.threads)
+    decoders = {name: get_decoder(name) for name in ("json", "orjson", "msgspec")}
+
+    times = {}
+    results = {}
+    for name, decoder in decoders.items():
+        results[name] = decoder.decode(content, RESPONSE_TYPE)
+        times[name] = min(
+            timeit.repeat(
+                lambda: decoder.decode(content, RESPONSE_TYPE),
+                number=1,
+                repeat=args.runs,
+            )
+        )
+        size = retained_size(lambda: decoder.decode(content, RESPONSE_TYPE))
+        print(
+            f"{name}: {times[name] * 1e3:.1f} ms,"
+            f" {times['json'] / times[name]:.1f}x json, {size / 2**20:.1f} MiB"
+        )
+
+    ok = True
+    for name in ("orjson", "msgspec"):
+        speedup = times["json"] / times[name]
+        fast = speedup >= args.min_speedup
+        ok = ok and fast
+        print(
+            f"[{'ok' if fast else 'FAIL'}] {name} speedup: {speedup:.1f}x,"
+            f" minimum {args.min_speedup:.1f}x"
+        )
+
+    same = results["orjson"] == results["json"] == results["msgspec"]
+    print(f"[{'ok' if same else 'FAIL'}] decoders give the same response")
+
+    drifted = json.loads(content)
+    del drifted["threads"][-1]["category"]
+    try:
+        decoders["msgspec"].decode(json.dumps(drifted).encode(), RESPONSE_TYPE)
+        rejected = False
+        message = "accepted"
+    except EdError as err:
+        rejected = True
+        message = str(err)
+    print(f"[{'ok' if rejected else 'FAIL'}] missing field: {message}")
+
+    sys.exit(0 if ok and same and rejected else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--threads", type=int, default=5000, help="number of threads in the response"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="number of runs to take the best of"
+    )
+    parser.add_argument(
+        "--min-speedup",
+        type=float,
+        default=1.5,
+        help="minimum speedup of orjson and msgspec over the standard library",
+    )
+    main(parser.parse_args())
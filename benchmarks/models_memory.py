@@ -0,0 +1,158 @@
+"""
+Memory benchmark, comparing a course worth of threads kept as plain dicts
+with the same threads kept as `edapi.models.Thread` models.
+
+Threads are generated with the fields of `API_Thread_WithUser` (as returned by
+`EdAPI.list_threads`) and decoded from JSON, like API responses;
+the script exits with a non-zero status if the models don't use at least
+`--min-ratio` times less memory than the dicts, or if converting the models
+back to dicts doesn't give the original threads.
+
+Usage:
+    python benchmarks/models_memory.py [--threads N] [--users N] [--min-ratio X]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from edapi.models import Thread
+
+
+def make_threads(count: int, users: int) -> str:
+    """
+    JSON list of `count` threads by `users` distinct users.
+    """
+    rng = random.Random(0)
+    authors = [
+        {
+            "avatar": None,
+            "course_role": rng.choice(["student", "student", "student", "staff"]),
+            "id": 100000 + i,
+            "name": f"User {i}",
+            "role": "user",
+            "tutorials": {},
+        }
+        for i in range(users)
+    ]
+    threads = []
+    for i in range(count):
+        author = rng.choice(authors)
+        timestamp = (
+            f"2024-{i % 12 + 1:02}-{i % 28 + 1:02}T10:{i % 60:02}:00.{i:06}+10:00"
+        )
+        threads.append(
+            {
+                "id": 1000000 + i,
+                "user_id": author["id"],
+                "course_id": 12345,
+                "editor_id": author["id"],
+                "accepted_id": None,
+                "duplicate_id": None,
+                "number": i + 1,
+                "type": rng.choice(["question", "post", "announcement"]),
+                "title": f"Question about homework {i}",
+                "content": (
+                    '<document version="2.0"><paragraph>'
+                    f"Question {i} about the homework</paragraph></document>"
+                ),
+                "document": f"Question {i} about the homework",
+                "category": rng.choice(["General", "Lectures", "Homework", "Exams"]),
+                "subcategory": rng.choice(["", "HW1", "HW2", "HW3"]),
+                "subsubcategory": "",
+                "flag_count": 0,
+                "star_count": rng.randrange(3),
+                "view_count": rng.randrange(500),
+                "unique_view_count": rng.randrange(300),
+                "vote_count": rng.randrange(5),
+                "reply_count": rng.randrange(10),
+                "unresolved_count": rng.randrange(2),
+                "is_locked": False,
+                "is_pinned": False,
+                "is_private": rng.random() < 0.2,
+                "is_endorsed": False,
+                "is_answered": rng.random() < 0.5,
+                "is_student_answered": False,
+                "is_staff_answered": rng.random() < 0.5,
+                "is_archived": False,
+                "is_anonymous": rng.random() < 0.3,
+                "is_megathread": False,
+                "anonymous_comments": False,
+                "approved_status": "approved",
+                "created_at": timestamp,
+                "updated_at": timestamp,
+                "deleted_at": None,
+                "pinned_at": None,
+                "anonymous_id": rng.randrange(1 << 30),
+                "vote": 0,
+                "is_seen": True,
+                "is_starred": False,
+                "is_watched": False,
+                "glanced_at": timestamp,
+                "new_reply_count": 0,
+                "duplicate_title": None,
+                "user": author,
+            }
+        )
+    return json.dumps(threads)
+
+
+def measure(load) -> tuple[int, list]:
+    """
+    Memory allocated by `load()` and still held by its result, in bytes.
+    """
+    tracemalloc.start()
+    try:
+        result = load()
+        return tracemalloc.get_traced_memory()[0], result
+    finally:
+        tracemalloc.stop()
+
+
+def main(args):
+    """
+    Run the benchmark, printing the results.
+    """
+    data = make_threads(args.threads, args.users)
+    dict_size, threads = measure(lambda: json.loads(data))
+    model_size, models = measure(lambda: Thread.from_dicts(json.loads(data)))
+
+    ratio = dict_size / model_size
+    ok = ratio >= args.min_ratio
+    same = [model.to_dict() for model in models] == threads
+    print(
+        f"dicts: {dict_size / 2**20:.1f} MiB, {dict_size / len(threads):.0f} B/thread"
+    )
+    print(
+        f"models: {model_size / 2**20:.1f} MiB, {model_size / len(models):.0f} B/thread"
+    )
+    print(
+        f"[{'ok' if ok else 'FAIL'}] memory ratio: {ratio:.1f}x,"
+        f" minimum {args.min_ratio:.1f}x"
+    )
+    print(f"[{'ok' if same else 'FAIL'}] models convert back to the original dicts")
+
+    sys.exit(0 if ok and same else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--threads", type=int, default=50000, help="number of threads in the course"
+    )
+    parser.add_argument(
+        "--users", type=int, default=2000, help="number of distinct thread authors"
+    )
+    parser.add_argument(
+        "--min-ratio",
+        type=float,
+        default=2.5,
+        help="minimum ratio of dict memory to model memory",
+    )
+    main(parser.parse_args())
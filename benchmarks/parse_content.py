@@ -0,0 +1,119 @@
+"""
+Document parsing benchmark, comparing the parser backends of `edapi.utils.parse_content`
+on a large document (an index post with many list items).
+
+Each backend parses the document and counts its list items, keeping the best
+of several runs; the script exits with a non-zero status if the lxml backend
+is not at least `--min-speedup` times faster than the BeautifulSoup backend,
+or if the backends disagree on the number of list items.
+
+Usage:
+    python benchmarks/parse_content.py [--items N] [--runs N] [--min-speedup X]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from edapi.document import DocumentBuilder
+from edapi.utils import iterparse_content, parse_content
+
+
+def build_document(items: int) -> str:
+    """
+    Build an index post with the given number of list items.
+    """
+    doc = DocumentBuilder()
+    for section in ("Homeworks", "Discussions", "Notes"):
+        doc.heading(section, level=2)
+        with doc.list("bullet"):
+            for i in range(items // 3):
+                with doc.list_item(), doc.paragraph():
+                    doc.text(f"{section} {i} ")
+                    doc.link(f"https://example.com/{section}/{i}", f"#{i}")
+    return doc.build()
+
+
+def count_bs4(content: str) -> int:
+    """
+    Count the list items of the document through the BeautifulSoup backend.
+    """
+    _, root = parse_content(content)
+    return len(root.find_all("list-item"))
+
+
+def count_tree(backend):
+    """
+    Count the list items of the document through an element tree backend.
+    """
+    return lambda content: sum(
+        1 for _ in parse_content(content, backend)[1].iter("list-item")
+    )
+
+
+def count_iterparse(content: str) -> int:
+    """
+    Count the list items of the document through an event stream.
+    """
+    count = 0
+    for _, element in iterparse_content(content):
+        if element.tag == "list-item":
+            count += 1
+    return count
+
+
+def main(args):
+    """
+    Run the benchmark, printing the results.
+    """
+    content = build_document(args.items)
+    counters = {
+        "bs4": count_bs4,
+        "lxml": count_tree("lxml"),
+        "etree": count_tree("etree"),
+        "etree iterparse": count_iterparse,
+    }
+
+    times = {}
+    counts = {}
+    for name, counter in counters.items():
+        counts[name] = counter(content)
+        times[name] = min(
+            timeit.repeat(lambda: counter(content), number=1, repeat=args.runs)
+        )
+        print(
+            f"{name}: {times[name] * 1e3:.1f} ms,"
+            f" {times['bs4'] / times[name]:.1f}x bs4"
+        )
+
+    speedup = times["bs4"] / times["lxml"]
+    ok = speedup >= args.min_speedup
+    same = len(set(counts.values())) == 1
+    print(
+        f"[{'ok' if ok else 'FAIL'}] lxml speedup: {speedup:.1f}x,"
+        f" minimum {args.min_speedup:.1f}x"
+    )
+    print(f"[{'ok' if same else 'FAIL'}] list item counts: {counts}")
+
+    sys.exit(0 if ok and same else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--items", type=int, default=3000, help="number of list items in the document"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="number of runs to take the best of"
+    )
+    parser.add_argument(
+        "--min-speedup",
+        type=float,
+        default=5.0,
+        help="minimum speedup of the lxml backend over bs4",
+    )
+    main(parser.parse_args())
@@ -0,0 +1,214 @@
+"""
+Streaming benchmark, comparing the peak memory of `EdAPI.list_threads` and
+`EdAPI.get_thread` with their streaming counterparts, `EdAPI.stream_threads`
+and `EdAPI.stream_thread_comments`, on large responses.
+
+Responses are served from memory by a transport adapter, so only the memory
+used to receive and decode them is measured; the script exits with a non-zero
+status if streaming doesn't lower the peak memory at least `--min-ratio` times,
+or if streaming gives different items (also when the responses are served
+from a response cache).
+
+Usage:
+    python benchmarks/streaming.py [--threads N] [--content-size N]
+                                   [--comments N] [--min-ratio X]
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tracemalloc
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from edapi import EdAPI
+from edapi.cache import ResponseCache
+
+
+class StaticAdapter(BaseAdapter):
+    """
+    Transport adapter serving fixed response bodies by URL path,
+    with an `ETag` for revalidating them.
+    """
+
+    def __init__(self, bodies: dict[str, bytes]):
+        super().__init__()
+        self.bodies = bodies
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        path = request.path_url.split("?", 1)[0]
+        etag = f'"{hash(self.bodies[path])}"'
+        response = Response()
+        response.headers["ETag"] = etag
+        if request.headers.get("If-None-Match") == etag:
+            response.status_code = 304
+            response.raw = io.BytesIO(b"")
+        else:
+            response.status_code = 200
+            response.headers["Content-Type"] = "application/json"
+            response.raw = io.BytesIO(self.bodies[path])
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def make_comment(comment_id: int, content_size: int, replies: int = 0) -> dict:
+    """
+    Comment with the given content size and number of replies.
+    """
+    return {
+        "id": comment_id,
+        "user_id": 1,
+        "thread_id": 1,
+        "content": "x" * content_size,
+        "document": "x" * content_size,
+        "comments": [
+            make_comment(comment_id * 10 + i, content_size) for i in range(replies)
+        ],
+    }
+
+
+def make_bodies(args) -> dict[str, bytes]:
+    """
+    Response bodies of a large page of threads and a thread with many comments.
+    """
+    threads = [
+        {
+            "id": i,
+            "number": i,
+            "title": f"Thread {i}",
+            "content": "x" * args.content_size,
+        }
+        for i in range(args.threads)
+    ]
+    thread = {
+        "id": 1,
+        "answers": [make_comment(i, 200, 2) for i in range(args.comments // 10)],
+        "comments": [make_comment(i, 200, 2) for i in range(args.comments)],
+    }
+    return {
+        "/api/courses/1/threads": json.dumps(
+            {"sort_key": "", "threads": threads, "users": []}
+        ).encode(),
+        "/api/threads/1": json.dumps({"thread": thread, "users": []}).encode(),
+    }
+
+
+def peak_memory(run) -> tuple[int, list]:
+    """
+    Peak memory allocated while calling `run()`, in bytes, and its result.
+    """
+    tracemalloc.start()
+    try:
+        result = run()
+        return tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+
+def main(args):
+    """
+    Run the benchmark, printing the results.
+    """
+    bodies = make_bodies(args)
+    ed = EdAPI("token", lazy=True, use_dotenv=False, adapter=StaticAdapter(bodies))
+
+    def thread_ids():
+        return [thread["id"] for thread in ed.list_threads(1, limit=args.threads)]
+
+    def streamed_thread_ids():
+        return [thread["id"] for thread in ed.stream_threads(1, limit=args.threads)]
+
+    def comment_ids():
+        thread = ed.get_thread(1)
+        return [c["id"] for c in thread["answers"]] + [
+            c["id"] for c in thread["comments"]
+        ]
+
+    def streamed_comment_ids():
+        return [comment["id"] for _, comment in ed.stream_thread_comments(1)]
+
+    ok = True
+    for name, buffered, streamed, size in (
+        (
+            "threads",
+            thread_ids,
+            streamed_thread_ids,
+            len(bodies["/api/courses/1/threads"]),
+        ),
+        ("comments", comment_ids, streamed_comment_ids, len(bodies["/api/threads/1"])),
+    ):
+        buffered_peak, buffered_ids = peak_memory(buffered)
+        streamed_peak, streamed_ids = peak_memory(streamed)
+        ratio = buffered_peak / streamed_peak
+        passed = ratio >= args.min_ratio and buffered_ids == streamed_ids
+        ok = ok and passed
+        print(
+            f"[{'ok' if passed else 'FAIL'}] {name} ({size / 2**20:.1f} MiB response):"
+            f" buffered peak {buffered_peak / 2**20:.1f} MiB,"
+            f" streamed peak {streamed_peak / 2**20:.1f} MiB,"
+            f" {ratio:.1f}x (minimum {args.min_ratio:.1f}x),"
+            f" {'same' if buffered_ids == streamed_ids else 'different'} items"
+        )
+
+    # streaming responses revalidated from a cache gives the same items
+    # (the functions above use the cached client from now on)
+    cache = ResponseCache()
+    ed = EdAPI(
+        "token",
+        lazy=True,
+        use_dotenv=False,
+        adapter=StaticAdapter(bodies),
+        cache=cache,
+    )
+    same = all(
+        streamed() == buffered()
+        for _ in range(2)
+        for buffered, streamed in (
+            (thread_ids, streamed_thread_ids),
+            (comment_ids, streamed_comment_ids),
+        )
+    )
+    same = same and cache.hits > 0
+    ok = ok and same
+    print(
+        f"[{'ok' if same else 'FAIL'}] cached responses:"
+        f" {cache.hits} hits, {'same' if same else 'different'} items"
+    )
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--threads", type=int, default=100, help="number of threads in the page"
+    )
+    parser.add_argument(
+        "--content-size",
+        type=int,
+        default=100000,
+        help="size of the content of each thread, in bytes",
+    )
+    parser.add_argument(
+        "--comments",
+        type=int,
+        default=5000,
+        help="number of top-level comments in the thread",
+    )
+    parser.add_argument(
+        "--min-ratio",
+        type=float,
+        default=5.0,
+        help="minimum ratio of buffered peak memory to streamed peak memory",
+    )
+    main(parser.parse_args())
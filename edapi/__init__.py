@@ -2,5 +2,19 @@
 Package for Ed API Python integration.
 """
 
-# the only default import should be the API class
-from .edapi import EdAPI
+from typing import TYPE_CHECKING
+
+# the only default import should be the API class;
+# it is loaded on first access, so that `import edapi` stays cheap
+if TYPE_CHECKING:
+    from .edapi import EdAPI
+
+__all__ = ["EdAPI"]
+
+
+def __getattr__(name: str):
+    if name == "EdAPI":
+        from .edapi import EdAPI  # pylint: disable=import-outside-toplevel
+
+        return EdAPI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,512 @@
+"""
+Module for interacting with the Ed API through asyncio.
+
+Requires the optional `httpx` dependency (`pip install edapi[async]`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+from typing import TYPE_CHECKING, Optional, Union
+
+import httpx
+from requests.compat import urljoin
+
+from .decoding import get_decoder
+from .edapi import (
+    ANSI_BLUE,
+    ANSI_GREEN,
+    ANSI_RED,
+    API_BASE_URL,
+    API_TOKEN_ENV_VAR,
+    AUTH_MESSAGE,
+    EDITABLE_THREAD_FIELDS,
+    STATIC_FILE_BASE_URL,
+    _as_put_thread,
+    _thread_changes,
+    _throw_error,
+)
+from .types import EdAuthError
+
+# type-only imports are skipped at runtime, to keep imports fast
+if TYPE_CHECKING:
+    from .decoding import JSONDecoder
+    from .types import EditThreadParams, PostThreadParams
+    from .types.api_types.endpoints.activity import (
+        API_ListUserActivity_Response,
+        API_ListUserActivity_Response_Item,
+    )
+    from .types.api_types.endpoints.analytics import API_Analytics_Users_Response
+    from .types.api_types.endpoints.files import (
+        API_PostFile_Response,
+        API_PostFileUrl_Request,
+    )
+    from .types.api_types.endpoints.threads import (
+        API_GetThread_Response,
+        API_ListThreads_Response,
+        API_PostThread_Response,
+        API_PutThread_Request,
+        API_PutThread_Response,
+        API_PutThread_Response_Thread,
+    )
+    from .types.api_types.endpoints.user import API_User_Response
+    from .types.api_types.thread import API_Thread_WithComments, API_Thread_WithUser
+    from .types.api_types.user import API_User_WithEmail
+
+# default maximum number of requests in flight at once
+DEFAULT_MAX_CONCURRENCY = 16
+
+
+def _ensure_login(func):
+    """
+    Decorator to ensure the user is logged in before awaiting the coroutine.
+    """
+
+    @functools.wraps(func)
+    async def login_wrapper(self, *args, **kwargs):
+        if self.api_token is None:
+            if self._login_lock is None:
+                self._login_lock = asyncio.Lock()
+            # only one coroutine logs in; the others wait for it
+            async with self._login_lock:
+                if self.api_token is None:
+                    await self.login()
+        return await func(self, *args, **kwargs)
+
+    return login_wrapper
+
+
+class AsyncEdAPI:
+    """
+    Class for asynchronous Ed API integration.
+
+    Mirrors every method of `EdAPI` as a coroutine, sharing the same response types.
+    All requests are made through a single `httpx.AsyncClient`, and at most
+    `max_concurrency` requests are in flight at any given time.
+
+    Unlike `EdAPI`, the API token is not validated on construction;
+    it is validated through `login()`, which is called automatically
+    before the first request if no token is loaded.
+
+    Responses are decoded with `json_decoder`, as in `EdAPI`.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        json_decoder: Union[str, JSONDecoder] = "json",
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.api_token = None
+        self.max_concurrency = max_concurrency
+        self.json_decoder = get_decoder(json_decoder)
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            )
+        )
+        # created lazily, so that they are bound to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._login_lock: Optional[asyncio.Lock] = None
+
+        self._read_api_token()
+
+    async def __aenter__(self) -> "AsyncEdAPI":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Close the underlying HTTP client and all pooled connections.
+        """
+        await self.client.aclose()
+
+    def _read_api_token(self) -> None:
+        """
+        Read the API token from .env file; defaults to None if not found.
+
+        The token is not verified here; see `_load_api_token`.
+        """
+        from dotenv import (  # pylint: disable=import-outside-toplevel
+            find_dotenv,
+            load_dotenv,
+        )
+
+        load_dotenv(find_dotenv(usecwd=True))
+        self.api_token = os.getenv(API_TOKEN_ENV_VAR, None)
+        if self.api_token is not None:
+            self.client.headers.update(self._auth_header)
+
+    async def _load_api_token(self) -> Optional[API_User_Response]:
+        """
+        Read the API token from .env file, and verify it through
+        the `/api/user` endpoint; returns the response if successful.
+        """
+        if self.api_token is None:
+            self._read_api_token()
+        if self.api_token is None:
+            # unable to load API token
+            return None
+
+        # authorization check
+        try:
+            return await self._get_user_info()
+        except EdAuthError:
+            # invalid api token; don't keep it
+            self.api_token = None
+            self._remove_auth_header()
+
+        return None
+
+    async def login(self):
+        """
+        Log in to the Ed API with the API token.
+
+        Continuously prompts for the API token if it is not found in the .env file.
+        """
+        user_info = await self._load_api_token()
+        while self.api_token is None:
+            print(AUTH_MESSAGE)
+            input(ANSI_RED("Press ENTER when you have done so."))
+            print()  # new line to divide next output
+            user_info = await self._load_api_token()
+
+            if self.api_token is None:
+                print(
+                    ANSI_RED("Invalid API Token; make sure you have the correct token.")
+                )
+
+        assert user_info is not None  # type coercion
+
+        # print login welcome message
+        user_dict = user_info["user"]
+        user_name = user_dict["name"]
+        user_email = user_dict["email"]
+        print(
+            "Authentication successful;",
+            f"logged in as {ANSI_GREEN(user_name)} ({ANSI_BLUE(user_email)})",
+        )
+
+    @property
+    def _auth_header(self):
+        """
+        Auth header with the API token for all requests.
+        """
+        return {"Authorization": f"Bearer {self.api_token}"}
+
+    def _remove_auth_header(self):
+        """
+        Remove the auth header from the client.
+        """
+        self.client.headers.pop("Authorization", None)
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Make a request through the shared client,
+        waiting for a free slot if too many requests are in flight.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await self.client.request(method, url, **kwargs)
+
+    def _decode(self, response: httpx.Response, response_type: str):
+        """
+        Decode the body of a response of the given type (see `edapi.decoding`).
+        """
+        return self.json_decoder.decode(response.content, response_type)
+
+    async def _get_user_info(self) -> API_User_Response:
+        """
+        Retrieve the user info from Ed, without ensuring a login first.
+        """
+        user_info_url = urljoin(API_BASE_URL, "user")
+        response = await self._request("GET", user_info_url)
+        if response.is_success:
+            return self._decode(response, "user.API_User_Response")
+
+        _throw_error("Failed to get user info.", response.content)
+
+    @_ensure_login
+    async def get_user_info(self) -> API_User_Response:
+        """
+        Retrieve the user info from Ed.
+        """
+        return await self._get_user_info()
+
+    @_ensure_login
+    async def list_user_activity(
+        self,
+        /,
+        user_id: int,
+        course_id: int,
+        *,
+        limit: int = 30,
+        offset: int = 0,
+        filter: str = "all",  # pylint: disable=redefined-builtin
+    ) -> list[API_ListUserActivity_Response_Item]:
+        """
+        Retrieve a list of comments and threads made by the user.
+
+        See `EdAPI.list_user_activity`.
+
+        GET /api/users/<user_id>/profile/activity?courseID=<course_id>
+        """
+        list_url = urljoin(API_BASE_URL, f"users/{user_id}/profile/activity")
+        response = await self._request(
+            "GET",
+            list_url,
+            params={
+                "courseID": course_id,
+                "limit": limit,
+                "offset": offset,
+                "filter": filter,
+            },
+        )
+        if response.is_success:
+            response_json: API_ListUserActivity_Response = self._decode(
+                response, "activity.API_ListUserActivity_Response"
+            )
+            return response_json.get("items", [])  # default to empty list
+
+        _throw_error(
+            f"Failed to list user activity for user {user_id} in course {course_id}.",
+            response.content,
+        )
+
+    @_ensure_login
+    async def list_threads(
+        self, /, course_id: int, *, limit: int = 30, offset: int = 0, sort: str = "new"
+    ) -> list[API_Thread_WithUser]:
+        """
+        Retrieve list of threads, with the given limit, offset, and sort.
+
+        See `EdAPI.list_threads`.
+
+        GET /api/courses/<course_id>/threads
+        """
+        list_url = urljoin(API_BASE_URL, f"courses/{course_id}/threads")
+        response = await self._request(
+            "GET", list_url, params={"limit": limit, "offset": offset, "sort": sort}
+        )
+        if response.is_success:
+            response_json: API_ListThreads_Response = self._decode(
+                response, "threads.API_ListThreads_Response"
+            )
+            return response_json["threads"]
+
+        _throw_error(
+            f"Failed to list threads for course {course_id}.", response.content
+        )
+
+    @_ensure_login
+    async def list_users(self, /, course_id: int) -> list[API_User_WithEmail]:
+        """
+        Retrieve list of users.
+
+        GET /api/courses/<course_id>/analytics/users
+        """
+        list_url = urljoin(API_BASE_URL, f"courses/{course_id}/analytics/users")
+        response = await self._request("GET", list_url)
+        if response.is_success:
+            response_json: API_Analytics_Users_Response = self._decode(
+                response, "analytics.API_Analytics_Users_Response"
+            )
+            return response_json["users"]
+
+        _throw_error(f"Failed to list users for course {course_id}", response.content)
+
+    @_ensure_login
+    async def get_thread(self, thread_id: int) -> API_Thread_WithComments:
+        """
+        Retrieve the details for a thread, given its id.
+
+        GET /api/threads/<thread_id>
+        """
+        thread_url = urljoin(API_BASE_URL, f"threads/{thread_id}")
+        response = await self._request("GET", thread_url)
+        if response.is_success:
+            response_json: API_GetThread_Response = self._decode(
+                response, "threads.API_GetThread_Response"
+            )
+            return response_json["thread"]
+
+        _throw_error(f"Failed to get thread {thread_id}.", response.content)
+
+    @_ensure_login
+    async def get_course_thread(
+        self, course_id: int, thread_number: int
+    ) -> API_Thread_WithComments:
+        """
+        Retrieve the details for a thread in a given course, using the thread number.
+
+        GET /api/courses/<course_id>/threads/<thread_id>
+        """
+        thread_url = urljoin(
+            API_BASE_URL, f"courses/{course_id}/threads/{thread_number}"
+        )
+        response = await self._request("GET", thread_url)
+        if response.is_success:
+            response_json: API_GetThread_Response = self._decode(
+                response, "threads.API_GetThread_Response"
+            )
+            return response_json["thread"]
+
+        _throw_error(f"Failed to get thread {thread_number}.", response.content)
+
+    @_ensure_login
+    async def post_thread(
+        self, course_id: int, params: PostThreadParams
+    ) -> API_Thread_WithUser:
+        """
+        Creates a new thread in the given course.
+
+        POST /api/courses/<course_id>/threads
+
+        Returns newly created thread object.
+        """
+        thread_url = urljoin(API_BASE_URL, f"courses/{course_id}/threads")
+        response = await self._request("POST", thread_url, json={"thread": params})
+        if response.is_success:
+            response_json: API_PostThread_Response = self._decode(
+                response, "threads.API_PostThread_Response"
+            )
+            return response_json["thread"]
+
+        _throw_error(f"Failed to post thread in course {course_id}.", response.content)
+
+    @_ensure_login
+    async def edit_thread(
+        self, thread_id: int, params: EditThreadParams, unlock_thread=True
+    ) -> API_PutThread_Response_Thread:
+        """
+        Edit the details for a given thread.
+
+        See `EdAPI.edit_thread`; as there, only the fields changed by the params
+        are sent, and no edit is made if the params would not change the thread.
+        Thread snapshots (`thread=`) are not supported.
+
+        PUT /api/threads/<thread_id>
+
+        Returns newly created thread object.
+        """
+
+        thread = await self.get_thread(thread_id)
+        if not _thread_changes(thread, params):
+            return _as_put_thread(thread)
+
+        relock = False
+        if unlock_thread and thread["is_locked"]:
+            # locked thread, so unlock it and re-lock at the very end
+            relock = True
+            await self.unlock_thread(thread_id)
+            # fetch thread again in case any side-effects happen
+            thread = await self.get_thread(thread_id)
+
+        # only send the changed fields, so that fields edited by others
+        # since the thread was retrieved are not overwritten
+        changes = {
+            key: val
+            for key, val in _thread_changes(thread, params).items()
+            if key in EDITABLE_THREAD_FIELDS
+        }
+
+        thread_url = urljoin(API_BASE_URL, f"threads/{thread_id}")
+        request_json: API_PutThread_Request = {"thread": changes}
+        try:
+            response = await self._request("PUT", thread_url, json=request_json)
+        finally:
+            if relock:
+                # relock thread if necessary
+                await self.lock_thread(thread_id)
+
+        if response.is_success:
+            response_json: API_PutThread_Response = self._decode(
+                response, "threads.API_PutThread_Response"
+            )
+            edited_thread = response_json["thread"]
+            if relock:
+                # the thread was locked again before returning
+                edited_thread["is_locked"] = True
+            return edited_thread
+
+        _throw_error(f"Failed to edit thread {thread_id}.", response.content)
+
+    @_ensure_login
+    async def upload_file(self, filename: str, file: bytes, content_type: str) -> str:
+        """
+        Upload a file to Ed.
+
+        See `EdAPI.upload_file`.
+
+        POST /api/files
+
+        Returns the static URL for the uploaded file.
+        """
+        upload_url = urljoin(API_BASE_URL, "files")
+        # send file through formdata
+        formdata = {"attachment": (filename, file, content_type)}
+        response = await self._request("POST", upload_url, files=formdata)
+        if response.is_success:
+            response_json: API_PostFile_Response = self._decode(
+                response, "files.API_PostFile_Response"
+            )
+            file_id = response_json["file"]["id"]
+            return urljoin(STATIC_FILE_BASE_URL, file_id)
+
+        _throw_error(f"Failed to upload file {filename}.", response.content)
+
+    @_ensure_login
+    async def upload_file_url(self, url: str) -> str:
+        """
+        Upload a file to Ed from a public URL.
+
+        See `EdAPI.upload_file_url`.
+
+        POST /api/files/url
+
+        Returns the static URL for the uploaded file.
+        """
+        upload_url = urljoin(API_BASE_URL, "files/url")
+        request: API_PostFileUrl_Request = {"url": url}
+        response = await self._request("POST", upload_url, json=request)
+        if response.is_success:
+            response_json: API_PostFile_Response = self._decode(
+                response, "files.API_PostFile_Response"
+            )
+            file_id = response_json["file"]["id"]
+            return urljoin(STATIC_FILE_BASE_URL, file_id)
+
+        _throw_error(f"Failed to upload file from {url}.", response.content)
+
+    @_ensure_login
+    async def lock_thread(self, thread_id: int) -> None:
+        """
+        Lock a given thread.
+
+        POST /api/threads/<thread_id>/lock
+        """
+        lock_url = urljoin(API_BASE_URL, f"threads/{thread_id}/lock")
+        response = await self._request("POST", lock_url)
+        if not response.is_success:
+            _throw_error(f"Failed to lock thread {thread_id}.", response.content)
+
+    @_ensure_login
+    async def unlock_thread(self, thread_id: int) -> None:
+        """
+        Unlock a given thread.
+
+        POST /api/threads/<thread_id>/unlock
+        """
+        unlock_url = urljoin(API_BASE_URL, f"threads/{thread_id}/unlock")
+        response = await self._request("POST", unlock_url)
+        if not response.is_success:
+            _throw_error(f"Failed to unlock thread {thread_id}.", response.content)
@@ -0,0 +1,312 @@
+"""
+HTTP response cache for read endpoints of the Ed API.
+
+Responses are revalidated through `ETag`/`Last-Modified` validators when the server
+sends them (`If-None-Match`/`If-Modified-Since`), and served from the cache on
+`304 Not Modified`; responses without validators can be cached for a fixed
+time per endpoint instead.
+"""
+
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, TypedDict
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+
+# methods whose responses can be cached
+_CACHEABLE_METHODS = ("GET",)
+# methods that never modify the resource
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class CacheEntry(TypedDict):
+    """
+    Cached response, along with its validators.
+    """
+
+    url: str
+    headers: dict[str, str]
+    content: bytes
+    encoding: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float  # time.time() when the entry was last validated
+
+
+class MemoryCacheStorage:
+    """
+    In-memory cache storage, evicting the least recently used entries
+    once `max_entries` is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Retrieve the entry for the given key, if any.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """
+        Store the entry for the given key.
+        """
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """
+        Remove the entry for the given key, if any.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class DiskCacheStorage:
+    """
+    On-disk cache storage, backed by an SQLite database at `path`.
+    """
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses"
+            " (key TEXT PRIMARY KEY, meta TEXT NOT NULL, content BLOB NOT NULL)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Retrieve the entry for the given key, if any.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT meta, content FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        meta, content = row
+        entry = json.loads(meta)
+        entry["content"] = bytes(content)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """
+        Store the entry for the given key.
+        """
+        meta = {k: v for k, v in entry.items() if k != "content"}
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, meta, content) VALUES (?, ?, ?)",
+                (key, json.dumps(meta), entry["content"]),
+            )
+
+    def delete(self, key: str) -> None:
+        """
+        Remove the entry for the given key, if any.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        """
+        Close the underlying database connection.
+        """
+        self._connection.close()
+
+
+class ResponseCache:
+    """
+    Cache of responses for GET requests, with hit/miss counters.
+
+    `storage` defaults to a `MemoryCacheStorage`; use a `DiskCacheStorage`
+    to keep the cache across processes.
+
+    `ttl` maps regular expressions (searched for in the request URL) to the number
+    of seconds a response without validators is served from the cache,
+    e.g. `{r"/api/user$": 300}`; responses without validators for other URLs
+    are not cached.
+    """
+
+    def __init__(
+        self,
+        storage=None,
+        *,
+        ttl: Optional[dict[str, float]] = None,
+    ):
+        self.storage = storage if storage is not None else MemoryCacheStorage()
+        self.ttl = [
+            (re.compile(pattern), seconds) for pattern, seconds in (ttl or {}).items()
+        ]
+
+        self.hits = 0  # responses served from the cache (fresh, or revalidated)
+        self.misses = 0  # responses retrieved in full from the server
+        self.revalidations = 0  # hits that required a 304 from the server
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        Snapshot of the cache counters.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+        }
+
+    def record(self, *, hit: bool, revalidated: bool = False) -> None:
+        """
+        Update the counters for a single lookup.
+        """
+        with self._lock:
+            if hit:
+                self.hits += 1
+                if revalidated:
+                    self.revalidations += 1
+            else:
+                self.misses += 1
+
+    def ttl_for(self, url: str) -> Optional[float]:
+        """
+        Time to live for responses without validators from the given URL,
+        or None if such responses should not be cached.
+        """
+        for pattern, seconds in self.ttl:
+            if pattern.search(url):
+                return seconds
+        return None
+
+    @staticmethod
+    def key_for(request: PreparedRequest) -> str:
+        """
+        Cache key for a request; responses are never shared between API tokens.
+        """
+        authorization = request.headers.get("Authorization", "")
+        token_hash = hashlib.sha256(authorization.encode()).hexdigest()[:16]
+        return f"{token_hash} {request.url}"
+
+
+class CachingAdapter(BaseAdapter):
+    """
+    Transport adapter that serves GET requests through a `ResponseCache`,
+    delegating all network traffic to the wrapped `adapter`.
+    """
+
+    def __init__(self, cache: ResponseCache, adapter: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.cache = cache
+        self.adapter = adapter if adapter is not None else HTTPAdapter()
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        if request.method not in _CACHEABLE_METHODS:
+            if request.method not in _SAFE_METHODS:
+                # the resource may have been modified
+                self.cache.storage.delete(ResponseCache.key_for(request))
+            return self.adapter.send(request, **kwargs)
+
+        key = ResponseCache.key_for(request)
+        entry = self.cache.storage.get(key)
+
+        if entry is not None:
+            if entry["etag"] is None and entry["last_modified"] is None:
+                ttl = self.cache.ttl_for(entry["url"])
+                if ttl is not None and time.time() - entry["stored_at"] < ttl:
+                    self.cache.record(hit=True)
+                    return self._build_response(request, entry)
+            else:
+                request = request.copy()
+                if entry["etag"] is not None:
+                    request.headers["If-None-Match"] = entry["etag"]
+                if entry["last_modified"] is not None:
+                    request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.adapter.send(request, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            # refresh the validators, in case the server sent new ones
+            entry["etag"] = response.headers.get("ETag", entry["etag"])
+            entry["last_modified"] = response.headers.get(
+                "Last-Modified", entry["last_modified"]
+            )
+            entry["stored_at"] = time.time()
+            self.cache.storage.set(key, entry)
+            self.cache.record(hit=True, revalidated=True)
+            response.close()
+            return self._build_response(request, entry)
+
+        self.cache.record(hit=False)
+        if response.status_code == 200:
+            self._store(key, request, response)
+        return response
+
+    def _store(self, key: str, request: PreparedRequest, response: Response) -> None:
+        """
+        Store a full response in the cache, if it can be revalidated or has a TTL.
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if (
+            etag is None
+            and last_modified is None
+            and self.cache.ttl_for(request.url or "") is None
+        ):
+            return
+        if "no-store" in response.headers.get("Cache-Control", ""):
+            return
+
+        self.cache.storage.set(
+            key,
+            {
+                "url": request.url or "",
+                "headers": dict(response.headers),
+                "content": response.content,
+                "encoding": response.encoding,
+                "etag": etag,
+                "last_modified": last_modified,
+                "stored_at": time.time(),
+            },
+        )
+
+    def _build_response(self, request: PreparedRequest, entry: CacheEntry) -> Response:
+        """
+        Build a response object from a cache entry.
+        """
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = entry["url"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = entry["encoding"]
+        # the body is already read, also for streamed requests (`stream=True`)
+        # pylint: disable=protected-access
+        response._content = entry["content"]
+        response._content_consumed = True
+        response.raw = io.BytesIO(entry["content"])
+        response.request = request
+        response.connection = self
+        response.from_cache = True  # type: ignore[attr-defined]
+        return response
+
+    def close(self) -> None:
+        self.adapter.close()
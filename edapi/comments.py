@@ -0,0 +1,167 @@
+"""
+Flattened index over the comment tree of a thread, built iteratively in one pass.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional
+
+if TYPE_CHECKING:
+    from .types.api_types.thread import API_Thread_Comment, API_Thread_WithComments
+
+
+class CommentIndex:
+    """
+    Flattened index over the answers and comments of a thread
+    (as returned by `EdAPI.get_thread`), including all nested replies.
+
+    Comments are stored in parallel lists, in depth-first order (answers first,
+    then comments, each followed by its replies); positions in these lists are
+    used to refer to comments:
+    - `comments`: the comment dicts
+    - `parents`: position of the parent comment, or -1 for top-level comments
+    - `children`: positions of the direct replies
+    - `depths`: 0 for top-level comments, 1 for their replies, etc.
+    - `kinds`: "answer" or "comment", the kind of the top-level comment of the tree
+
+    The tree is walked iteratively, so arbitrarily deep threads can be indexed.
+    """
+
+    def __init__(self, thread: API_Thread_WithComments):
+        self.thread_id = thread["id"]
+        self.comments: list[API_Thread_Comment] = []
+        self.parents: list[int] = []
+        self.children: list[list[int]] = []
+        self.depths: list[int] = []
+        self.kinds: list[str] = []
+
+        # position of each comment, by id
+        self.positions: dict[int, int] = {}
+        # positions of the comments of each user, by user id
+        self.user_positions: dict[int, list[int]] = {}
+
+        # (comment, parent position, depth, kind), in reverse order of visit
+        stack = [
+            (comment, -1, 0, kind)
+            for kind, key in (("comment", "comments"), ("answer", "answers"))
+            for comment in reversed(thread[key])
+        ]
+        user_positions = defaultdict(list)
+        # bound methods, as this loop runs once per comment
+        pop = stack.pop
+        push = stack.append
+        add_comment = self.comments.append
+        add_parent = self.parents.append
+        add_children = self.children.append
+        add_depth = self.depths.append
+        add_kind = self.kinds.append
+        children = self.children
+        positions = self.positions
+
+        position = 0
+        while stack:
+            comment, parent, depth, kind = pop()
+            add_comment(comment)
+            add_parent(parent)
+            add_children([])
+            add_depth(depth)
+            add_kind(kind)
+            positions[comment["id"]] = position
+            user_positions[comment["user_id"]].append(position)
+            if parent >= 0:
+                children[parent].append(position)
+
+            replies = comment["comments"]
+            for index in range(len(replies) - 1, -1, -1):
+                push((replies[index], position, depth + 1, kind))
+            position += 1
+
+        self.user_positions = dict(user_positions)
+
+    def __len__(self) -> int:
+        return len(self.comments)
+
+    def __iter__(self) -> Iterator[API_Thread_Comment]:
+        return iter(self.comments)
+
+    def __contains__(self, comment_id: int) -> bool:
+        return comment_id in self.positions
+
+    def get(self, comment_id: int) -> Optional[API_Thread_Comment]:
+        """
+        Retrieve a comment by its id, or None if it is not in the thread.
+        """
+        position = self.positions.get(comment_id)
+        return self.comments[position] if position is not None else None
+
+    def parent(self, comment_id: int) -> Optional[API_Thread_Comment]:
+        """
+        Retrieve the parent of a comment, or None for top-level comments.
+        """
+        parent = self.parents[self.positions[comment_id]]
+        return self.comments[parent] if parent >= 0 else None
+
+    def replies(self, comment_id: int) -> list[API_Thread_Comment]:
+        """
+        Retrieve the direct replies to a comment.
+        """
+        return [
+            self.comments[child] for child in self.children[self.positions[comment_id]]
+        ]
+
+    def ancestors(self, comment_id: int) -> list[API_Thread_Comment]:
+        """
+        Retrieve the ancestors of a comment, from its parent up to the top-level comment.
+        """
+        result = []
+        parent = self.parents[self.positions[comment_id]]
+        while parent >= 0:
+            result.append(self.comments[parent])
+            parent = self.parents[parent]
+        return result
+
+    def depth(self, comment_id: int) -> int:
+        """
+        Depth of a comment; 0 for top-level comments.
+        """
+        return self.depths[self.positions[comment_id]]
+
+    def kind(self, comment_id: int) -> str:
+        """
+        Whether a comment is in the tree of an "answer" or a "comment".
+        """
+        return self.kinds[self.positions[comment_id]]
+
+    def filter(
+        self, predicate: Callable[[API_Thread_Comment], bool]
+    ) -> list[API_Thread_Comment]:
+        """
+        Retrieve the comments matching a predicate, in depth-first order.
+        """
+        return [comment for comment in self.comments if predicate(comment)]
+
+    def unresolved(self) -> list[API_Thread_Comment]:
+        """
+        Retrieve the unresolved top-level comments (questions in the thread);
+        replies and answers can't be resolved.
+        """
+        return [
+            self.comments[position]
+            for position, (depth, kind) in enumerate(zip(self.depths, self.kinds))
+            if depth == 0
+            and kind == "comment"
+            and not self.comments[position]["is_resolved"]
+        ]
+
+    def by_users(self, user_ids: Iterable[int]) -> list[API_Thread_Comment]:
+        """
+        Retrieve the comments by any of the given users (e.g. the staff of a course),
+        in depth-first order.
+        """
+        positions = sorted(
+            position
+            for user_id in set(user_ids)
+            for position in self.user_positions.get(user_id, ())
+        )
+        return [self.comments[position] for position in positions]
@@ -0,0 +1,159 @@
+"""
+Pluggable JSON decoders for API responses.
+
+Responses are decoded from their raw bytes by a `JSONDecoder`;
+the decoder used by a client is chosen with the `json_decoder` option.
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from .types import EdError
+
+if TYPE_CHECKING:
+    import msgspec
+
+# package holding the response types, given to decoders as "<module>.<type name>"
+_RESPONSE_TYPES_PACKAGE = "edapi.types.api_types.endpoints"
+
+
+def resolve_response_type(response_type: str) -> type:
+    """
+    Retrieve a response type by its name relative to `edapi.types.api_types.endpoints`,
+    e.g. `"threads.API_GetThread_Response"`.
+    """
+    module_name, _, type_name = response_type.rpartition(".")
+    module = importlib.import_module(f"{_RESPONSE_TYPES_PACKAGE}.{module_name}")
+    return getattr(module, type_name)
+
+
+class JSONDecoder:
+    """
+    Decodes responses with the standard library `json` module, without validation.
+
+    Subclasses override `decode`; `response_type` is the name of the type of the
+    response (see `resolve_response_type`), or None if it has no declared type.
+    """
+
+    name = "json"
+
+    def decode(self, content: bytes, response_type: Optional[str] = None) -> Any:
+        """
+        Decode the raw body of a response.
+        """
+        return json.loads(content)
+
+
+class OrjsonDecoder(JSONDecoder):
+    """
+    Decodes responses with `orjson`, without validation.
+
+    Requires the optional `orjson` dependency (`pip install edapi[orjson]`).
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson  # pylint: disable=import-outside-toplevel
+
+        self._loads = orjson.loads
+
+    def decode(self, content: bytes, response_type: Optional[str] = None) -> Any:
+        return self._loads(content)
+
+
+class MsgspecDecoder(JSONDecoder):
+    """
+    Decodes responses with `msgspec`, validating them against the TypedDicts
+    in `edapi.types.api_types`.
+
+    A response that doesn't match its type (e.g. a missing field, or a field with
+    the wrong type) raises an `EdError`, whose response gives the path of
+    the mismatch; fields not declared in the types are dropped. Responses whose
+    types msgspec can't represent (e.g. unions of several TypedDicts) are decoded
+    without validation. If `validate` is False, no responses are validated.
+
+    Requires the optional `msgspec` dependency (`pip install edapi[msgspec]`).
+    """
+
+    name = "msgspec"
+
+    def __init__(self, *, validate: bool = True):
+        # pylint: disable=import-outside-toplevel
+        import msgspec
+
+        from .types.api_types.content import ContentString
+
+        self.validate = validate
+        self._content_string = ContentString
+        self._validation_error = msgspec.ValidationError
+        self._untyped = msgspec.json.Decoder()
+        # typed decoders, by response type; built on first use
+        self._decoders: dict[str, msgspec.json.Decoder] = {}
+
+    def _decoder(self, response_type: str) -> msgspec.json.Decoder:
+        """
+        Retrieve (or build) the decoder for a response type.
+        """
+        decoder = self._decoders.get(response_type)
+        if decoder is None:
+            import msgspec  # pylint: disable=import-outside-toplevel
+
+            try:
+                decoder = msgspec.json.Decoder(
+                    resolve_response_type(response_type),
+                    dec_hook=self._decode_hook,
+                )
+            except TypeError:
+                # not representable in msgspec
+                decoder = self._untyped
+            self._decoders[response_type] = decoder
+        return decoder
+
+    def _decode_hook(self, target_type: type, value: Any) -> Any:
+        """
+        Decode values of types msgspec does not support natively
+        (content strings, which are decoded as plain strings first).
+        """
+        if target_type is self._content_string:
+            if not isinstance(value, str):
+                raise TypeError(f"Expected `str`, got `{type(value).__name__}`")
+            return self._content_string(value)
+        raise NotImplementedError(f"unsupported type {target_type!r}")
+
+    def decode(self, content: bytes, response_type: Optional[str] = None) -> Any:
+        if response_type is None or not self.validate:
+            return self._untyped.decode(content)
+        try:
+            return self._decoder(response_type).decode(content)
+        except self._validation_error as err:
+            type_name = response_type.rpartition(".")[2]
+            raise EdError(
+                {
+                    "message": f"Response does not match {type_name}.",
+                    "response": str(err),
+                }
+            ) from err
+
+
+_DECODERS: dict[str, type[JSONDecoder]] = {
+    decoder.name: decoder for decoder in (JSONDecoder, OrjsonDecoder, MsgspecDecoder)
+}
+
+
+def get_decoder(decoder: Union[str, JSONDecoder]) -> JSONDecoder:
+    """
+    Retrieve a decoder by name (`"json"`, `"orjson"` or `"msgspec"`),
+    or pass through a decoder instance.
+    """
+    if isinstance(decoder, JSONDecoder):
+        return decoder
+    if decoder not in _DECODERS:
+        raise ValueError(
+            f"unknown JSON decoder {decoder!r};"
+            f" expected one of {', '.join(map(repr, _DECODERS))}"
+        )
+    return _DECODERS[decoder]()
@@ -0,0 +1,498 @@
+"""
+Lightweight builder and patch functions for Ed documents, working directly
+on XML strings instead of BeautifulSoup trees.
+
+See the "Document Format" section of the docs for the available tags.
+"""
+
+from __future__ import annotations
+
+import functools
+import html
+import io
+import re
+from typing import Iterator, NamedTuple, Optional, Union
+
+AttributeValue = Union[str, int, float, bool]
+
+# XML markup in a document: comments, CDATA sections and processing instructions
+# (which are skipped), and start, end and empty-element tags
+_MARKUP_PATTERN = re.compile(
+    r"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>"
+    r"|<(?P<end>/)?(?P<tag>[^\s/>!?]+)"
+    r"(?:\s+[^\s=/>]+\s*=\s*(?:\"[^\"]*\"|'[^']*'))*\s*(?P<empty>/)?>",
+    re.DOTALL,
+)
+# step of an element path, e.g. "list[1]"
+_PATH_STEP_PATTERN = re.compile(r"(?P<tag>[^\s/\[\]]+)(?:\[(?P<index>-?\d+)\])?")
+
+
+def escape_text(text: str) -> str:
+    """
+    Escape text content for an XML element.
+    """
+    return html.escape(text, quote=False)
+
+
+def _format_attributes(attributes: dict[str, Optional[AttributeValue]]) -> str:
+    """
+    Format attributes for an XML start tag, skipping None values.
+    """
+    parts = []
+    for name, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        parts.append(f' {name}="{html.escape(str(value))}"')
+    return "".join(parts)
+
+
+class _OpenElement:
+    """
+    Context manager closing an element of a `DocumentBuilder` on exit.
+    """
+
+    __slots__ = ("builder", "depth")
+
+    def __init__(self, builder: DocumentBuilder, depth: Optional[int]):
+        self.builder = builder
+        # depth of the element in the builder's stack, or None if already closed
+        self.depth = depth
+
+    def __enter__(self) -> DocumentBuilder:
+        return self.builder
+
+    def __exit__(self, *exc_info) -> None:
+        if self.depth is not None:
+            self.builder.close(self.depth)
+
+
+class DocumentBuilder:
+    """
+    Builds a `<document version="2.0">` document by writing XML to a string buffer.
+
+    Container tags are opened through context managers, closing the tag on exit;
+    if given text, they are written (and closed) immediately instead:
+
+        doc = DocumentBuilder()
+        doc.heading("Homeworks", level=2)
+        with doc.list("bullet"):
+            with doc.list_item():
+                doc.paragraph("Homework 1")
+        with doc.paragraph():
+            doc.text("Source: ")
+            doc.link("https://example.com")
+        content = doc.build()
+
+    Text and attribute values are escaped. If `fragment` is True, the output is
+    not wrapped in a `<document>` tag, e.g. to insert it with `append_child`.
+    """
+
+    def __init__(self, *, fragment: bool = False):
+        self.fragment = fragment
+        self._buffer = io.StringIO()
+        if not fragment:
+            self._buffer.write('<document version="2.0">')
+        self._stack: list[str] = []
+
+    # ===== generic elements =====
+
+    def open(self, tag: str, **attributes: Optional[AttributeValue]) -> _OpenElement:
+        """
+        Open an element; use the result as a context manager to close it,
+        or close it with `close`.
+        """
+        self._buffer.write(f"<{tag}{_format_attributes(attributes)}>")
+        self._stack.append(tag)
+        return _OpenElement(self, len(self._stack))
+
+    def close(self, depth: Optional[int] = None) -> None:
+        """
+        Close the innermost open element, or all elements down to the given depth
+        (the number of open elements, including itself, when it was opened).
+        """
+        if not self._stack:
+            raise ValueError("no open element to close")
+        if depth is None:
+            depth = len(self._stack)
+        while len(self._stack) >= depth:
+            self._buffer.write(f"</{self._stack.pop()}>")
+
+    def element(
+        self,
+        tag: str,
+        text: Optional[str] = None,
+        **attributes: Optional[AttributeValue],
+    ) -> _OpenElement:
+        """
+        Open an element; if `text` is given, the element is written with the text
+        and closed immediately, and the result is a no-op context manager.
+        """
+        if text is None:
+            return self.open(tag, **attributes)
+        self._buffer.write(
+            f"<{tag}{_format_attributes(attributes)}>{escape_text(text)}</{tag}>"
+        )
+        return _OpenElement(self, None)
+
+    def empty(self, tag: str, **attributes: Optional[AttributeValue]) -> None:
+        """
+        Write an element without content.
+        """
+        self._buffer.write(f"<{tag}{_format_attributes(attributes)}/>")
+
+    def text(self, text: str) -> None:
+        """
+        Write text in the current element.
+        """
+        self._buffer.write(escape_text(text))
+
+    def raw(self, fragment: str) -> None:
+        """
+        Write an XML fragment as is, e.g. from `EdAPI.upload_image`;
+        the fragment must be well-formed.
+        """
+        self._buffer.write(fragment)
+
+    # ===== block elements =====
+
+    def heading(self, text: Optional[str] = None, level: int = 1) -> _OpenElement:
+        """
+        Heading; `level` 1 is the largest.
+        """
+        return self.element("heading", text, level=level)
+
+    def paragraph(self, text: Optional[str] = None) -> _OpenElement:
+        """
+        Paragraph; all text must be in a paragraph.
+        """
+        return self.element("paragraph", text)
+
+    def list(self, style: str = "bullet") -> _OpenElement:
+        """
+        List; `style` is one of "bullet" or "number".
+        """
+        return self.open("list", style=style)
+
+    def list_item(self, text: Optional[str] = None) -> _OpenElement:
+        """
+        List item; if `text` is given, it is written in a paragraph.
+        """
+        if text is None:
+            return self.open("list-item")
+        self._buffer.write(
+            f"<list-item><paragraph>{escape_text(text)}</paragraph></list-item>"
+        )
+        return _OpenElement(self, None)
+
+    def callout(self, callout_type: str = "info") -> _OpenElement:
+        """
+        Callout bubble; `callout_type` is "success", "info", "warning" or "error".
+        """
+        return self.open("callout", type=callout_type)
+
+    def spoiler(self) -> _OpenElement:
+        """
+        Spoiler; text within must be in paragraphs.
+        """
+        return self.open("spoiler")
+
+    def pre(self, text: str) -> None:
+        """
+        Code block, without syntax highlighting.
+        """
+        self.element("pre", text)
+
+    def snippet(self, code: str, language: str, runnable: bool = False) -> None:
+        """
+        Code snippet, with syntax highlighting.
+        """
+        self.element("snippet", code, language=language, runnable=runnable)
+
+    def figure(self) -> _OpenElement:
+        """
+        Container for images.
+        """
+        return self.open("figure")
+
+    def image(self, src: str, width: int, height: int) -> None:
+        """
+        Embedded image; `width` and `height` define the aspect ratio.
+        """
+        self.empty("image", src=src, width=width, height=height)
+
+    def file(self, url: str, filename: Optional[str] = None) -> None:
+        """
+        Embedded file.
+        """
+        self.empty("file", url=url, filename=filename)
+
+    # ===== inline elements =====
+
+    def bold(self, text: Optional[str] = None) -> _OpenElement:
+        """
+        Bold text.
+        """
+        return self.element("bold", text)
+
+    def italic(self, text: Optional[str] = None) -> _OpenElement:
+        """
+        Italic text.
+        """
+        return self.element("italic", text)
+
+    def underline(self, text: Optional[str] = None) -> _OpenElement:
+        """
+        Underlined text.
+        """
+        return self.element("underline", text)
+
+    def code(self, text: str) -> None:
+        """
+        Inline code.
+        """
+        self.element("code", text)
+
+    def math(self, latex: str) -> None:
+        """
+        LaTeX math.
+        """
+        self.element("math", latex)
+
+    def link(self, href: str, text: Optional[str] = None) -> None:
+        """
+        Link; the text defaults to the URL.
+        """
+        self.element("link", href if text is None else text, href=href)
+
+    # ===== output =====
+
+    def build(self) -> str:
+        """
+        The finished document (or fragment);
+        raises ValueError if any element is still open.
+        """
+        if self._stack:
+            raise ValueError(f"unclosed elements: {', '.join(self._stack)}")
+        if self.fragment:
+            return self._buffer.getvalue()
+        return self._buffer.getvalue() + "</document>"
+
+    def __str__(self) -> str:
+        return self.build()
+
+
+# ===== patching =====
+
+
+class ElementSpan(NamedTuple):
+    """
+    Offsets of an element in a document string.
+
+    The element is `content[start:end]`, and its children are
+    `content[inner_start:inner_end]`; for an empty-element tag (`<tag/>`),
+    all of `inner_start`, `inner_end` and `end` are the end of the tag.
+    """
+
+    start: int
+    inner_start: int
+    inner_end: int
+    end: int
+
+    @property
+    def is_empty_tag(self) -> bool:
+        """
+        Whether the element is written as an empty-element tag (`<tag/>`).
+        """
+        return self.inner_start == self.end
+
+
+def _parse_path(path: str) -> list[tuple[str, int]]:
+    """
+    Parse an element path into (tag, index) steps.
+    """
+    steps = []
+    for step in path.strip("/").split("/") if path.strip("/") else []:
+        match = _PATH_STEP_PATTERN.fullmatch(step)
+        if match is None:
+            raise ValueError(f"Invalid element path {path!r}")
+        steps.append((match["tag"], int(match["index"] or 0)))
+    return steps
+
+
+@functools.lru_cache(maxsize=64)
+def _same_tag_pattern(tag: str) -> re.Pattern:
+    """
+    Pattern matching the start, end and empty-element tags with the given name.
+    """
+    return re.compile(
+        rf"<(?P<end>/)?{re.escape(tag)}(?=[\s/>])"
+        r"(?:[^>\"'/]+|\"[^\"]*\"|'[^']*'|/(?!>))*(?P<empty>/)?>"
+    )
+
+
+def _find_end_tag(content: str, tag: str, position: int, limit: int) -> re.Match:
+    """
+    Find the end tag of an element with the given name, whose start tag ends
+    at `position`, looking only at the tags with the same name.
+    """
+    depth = 1
+    for match in _same_tag_pattern(tag).finditer(content, position, limit):
+        if match["end"]:
+            depth -= 1
+            if depth == 0:
+                return match
+        elif not match["empty"]:
+            depth += 1
+    raise ValueError(f"Unclosed element <{tag}>")
+
+
+def _children(content: str, parent: ElementSpan) -> Iterator[tuple[str, ElementSpan]]:
+    """
+    Scan the direct children of an element, yielding (tag, span) pairs.
+
+    The end of each child is found by looking only at the tags with the same name,
+    so the contents of skipped children are never tokenized.
+    """
+    position = parent.inner_start
+    while True:
+        match = _MARKUP_PATTERN.search(content, position, parent.inner_end)
+        if match is None:
+            return
+        tag = match["tag"]
+        position = match.end()
+        if tag is None:
+            continue
+        if match["end"]:
+            raise ValueError(f"Unexpected end tag </{tag}>")
+        if match["empty"]:
+            yield tag, ElementSpan(match.start(), match.end(), match.end(), match.end())
+            continue
+
+        end_match = _find_end_tag(content, tag, position, parent.inner_end)
+        yield tag, ElementSpan(
+            match.start(), match.end(), end_match.start(), end_match.end()
+        )
+        position = end_match.end()
+
+
+def _root(content: str) -> ElementSpan:
+    """
+    Span of the root element of a document.
+    """
+    end = len(content.rstrip())
+    for match in _MARKUP_PATTERN.finditer(content):
+        if match["tag"] is None:
+            continue
+        if match["end"]:
+            break
+        if match["empty"]:
+            return ElementSpan(match.start(), match.end(), match.end(), match.end())
+        # the root element ends with the last end tag of the document
+        inner_end = content.rfind("</", 0, end)
+        if inner_end < match.end():
+            break
+        return ElementSpan(match.start(), match.end(), inner_end, end)
+    raise ValueError("Document has no root element")
+
+
+def find_element(content: str, path: str) -> ElementSpan:
+    """
+    Find an element of a document by its path, scanning only its ancestors
+    and their earlier children instead of parsing the whole document.
+
+    The path lists the tag and the (0-based) index among the siblings with that tag
+    of each element from the root (excluded), separated by slashes;
+    negative indices count from the end, and omitted indices are 0.
+    For instance, "list[1]/list-item[-1]" is the last item of the second top-level
+    list, and "" is the root `<document>` element.
+
+    Raises ValueError if there is no such element.
+    """
+    span = _root(content)
+    for tag, index in _parse_path(path):
+        matching = (
+            child for child_tag, child in _children(content, span) if child_tag == tag
+        )
+        found = None
+        if index >= 0:
+            for position, child in enumerate(matching):
+                if position == index:
+                    found = child
+                    break
+        else:
+            siblings = list(matching)
+            if -index <= len(siblings):
+                found = siblings[index]
+        if found is None:
+            raise ValueError(f"No element at path {path!r}")
+        span = found
+    return span
+
+
+def _splice(content: str, start: int, end: int, fragment: str) -> str:
+    """
+    Replace `content[start:end]` with the fragment.
+    """
+    return content[:start] + fragment + content[end:]
+
+
+def append_child(content: str, path: str, fragment: str) -> str:
+    """
+    Append an XML fragment (e.g. from a `DocumentBuilder` or `EdAPI.upload_image`)
+    as the last children of the element at the given path;
+    see `find_element` for the path format.
+
+    Returns the patched document.
+    """
+    span = find_element(content, path)
+    if span.is_empty_tag:
+        # expand <tag .../> into <tag ...>fragment</tag>
+        start_tag = content[span.start : span.end].rstrip("/>").rstrip()
+        tag = _MARKUP_PATTERN.match(content, span.start)["tag"]
+        return _splice(content, span.start, span.end, f"{start_tag}>{fragment}</{tag}>")
+    return _splice(content, span.inner_end, span.inner_end, fragment)
+
+
+def prepend_child(content: str, path: str, fragment: str) -> str:
+    """
+    Insert an XML fragment as the first children of the element at the given path.
+
+    Returns the patched document.
+    """
+    span = find_element(content, path)
+    if span.is_empty_tag:
+        return append_child(content, path, fragment)
+    return _splice(content, span.inner_start, span.inner_start, fragment)
+
+
+def insert_before(content: str, path: str, fragment: str) -> str:
+    """
+    Insert an XML fragment before the element at the given path.
+
+    Returns the patched document.
+    """
+    span = find_element(content, path)
+    return _splice(content, span.start, span.start, fragment)
+
+
+def insert_after(content: str, path: str, fragment: str) -> str:
+    """
+    Insert an XML fragment after the element at the given path.
+
+    Returns the patched document.
+    """
+    span = find_element(content, path)
+    return _splice(content, span.end, span.end, fragment)
+
+
+def replace_element(content: str, path: str, fragment: str) -> str:
+    """
+    Replace the element at the given path with an XML fragment
+    (an empty fragment removes the element).
+
+    Returns the patched document.
+    """
+    span = find_element(content, path)
+    return _splice(content, span.start, span.end, fragment)
@@ -2,33 +2,67 @@
 Module for interacting with the Ed API.
 """
 
+from __future__ import annotations
+
+import hashlib
 import json
 import os
-from typing import NoReturn, Optional
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Iterator,
+    NoReturn,
+    Optional,
+    TypeVar,
+    Union,
+)
 
 import requests
-from dotenv import find_dotenv, load_dotenv
+from requests.adapters import DEFAULT_POOLSIZE, BaseAdapter, HTTPAdapter
 from requests.compat import urljoin
 
-from edapi.types.api_types.endpoints.analytics import API_Analytics_Users_Response
-
-from .types import EdAuthError, EdError, EditThreadParams, PostThreadParams
-from .types.api_types.endpoints.activity import (
-    API_ListUserActivity_Response,
-    API_ListUserActivity_Response_Item,
-)
-from .types.api_types.endpoints.files import API_PostFile_Response
-from .types.api_types.endpoints.threads import (
-    API_GetThread_Response,
-    API_ListThreads_Response,
-    API_PostThread_Response,
-    API_PutThread_Request,
-    API_PutThread_Response,
-    API_PutThread_Response_Thread,
-)
-from .types.api_types.endpoints.user import API_User_Response
-from .types.api_types.thread import API_Thread_WithComments, API_Thread_WithUser
-from .types.api_types.user import API_User_WithEmail
+from .decoding import get_decoder
+from .ratelimit import DEFAULT_MAX_RETRIES, RateLimitedAdapter, RateLimiter
+from .types import EdAuthError, EdError, EditThreadParams
+
+# type-only imports are skipped at runtime, to keep imports fast
+if TYPE_CHECKING:
+    from .cache import ResponseCache
+    from .decoding import JSONDecoder
+    from .edit_session import ThreadEditSession
+    from .streaming import JSONPath
+    from .types import PostThreadParams
+    from .types.api_types.endpoints.activity import (
+        API_ListUserActivity_Response,
+        API_ListUserActivity_Response_Item,
+    )
+    from .types.api_types.endpoints.analytics import API_Analytics_Users_Response
+    from .types.api_types.endpoints.files import (
+        API_PostFile_Response,
+        API_PostFileUrl_Request,
+    )
+    from .types.api_types.endpoints.threads import (
+        API_GetThread_Response,
+        API_ListThreads_Response,
+        API_PostThread_Response,
+        API_PutThread_Request,
+        API_PutThread_Response,
+        API_PutThread_Response_Thread,
+    )
+    from .types.api_types.endpoints.user import API_User_Response
+    from .types.api_types.thread import (
+        API_Thread,
+        API_Thread_Comment,
+        API_Thread_WithComments,
+        API_Thread_WithUser,
+    )
+    from .types.api_types.user import API_User_WithEmail
+    from .upload import FileSource, ProgressCallback, UploadIndex
 
 ANSI_BLUE = lambda text: f"\u001b[34m{text}\u001b[0m"
 ANSI_GREEN = lambda text: f"\u001b[32m{text}\u001b[0m"
@@ -39,6 +73,27 @@ STATIC_FILE_BASE_URL = "https://static.us.edusercontent.com/files/"
 
 API_TOKEN_ENV_VAR = "ED_API_TOKEN"
 
+# default number of seconds cached user info is used to validate the API token
+DEFAULT_USER_CACHE_TTL = 24 * 60 * 60
+
+# maximum number of threads the server returns in a single page
+MAX_THREADS_PAGE_SIZE = 100
+
+# fields of a thread that are sent when editing it
+EDITABLE_THREAD_FIELDS = tuple(EditThreadParams.__annotations__)
+
+# default number of times an edit is retried after the thread was locked concurrently
+DEFAULT_MAX_CONFLICT_RETRIES = 2
+
+# default number of worker threads for bulk requests
+DEFAULT_MAX_WORKERS = 8
+
+# default number of bytes read at a time from streamed responses
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+
+_K = TypeVar("_K")
+_V = TypeVar("_V")
+
 AUTH_MESSAGE = f"""
 Go to
     {ANSI_BLUE("https://edstem.org/us/settings/api-tokens")}
@@ -65,7 +120,19 @@ def _throw_error(message: str, error_content: bytes) -> NoReturn:
     """
     Throw an error with the given message and the error content.
     """
-    error_json = json.loads(error_content)
+    try:
+        error_json = json.loads(error_content)
+    except ValueError:
+        # not a JSON error; e.g. an HTML page from a proxy
+        error_json = None
+    if not isinstance(error_json, dict):
+        raise EdError(
+            {
+                "message": message,
+                "response": error_content.decode("utf-8", errors="replace"),
+            }
+        )
+
     if error_json.get("code") == "bad_token":
         # auth error
         raise EdAuthError(
@@ -76,6 +143,127 @@ def _throw_error(message: str, error_content: bytes) -> NoReturn:
     raise EdError({"message": message, "response": error_json})
 
 
+def _thread_changes(thread: API_Thread, params: EditThreadParams) -> dict:
+    """
+    Params that would change the given thread.
+
+    Only values that have appeared in the existing thread object are considered,
+    and None values are ignored.
+    """
+    return {
+        key: val
+        for key, val in params.items()
+        if key in thread and val is not None and thread[key] != val
+    }
+
+
+def _as_put_thread(thread: API_Thread) -> API_PutThread_Response_Thread:
+    """
+    Thread object in the shape returned by an edit (PUT) request,
+    i.e. without the fields specific to the current user.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .types.api_types.endpoints.threads import API_PutThread_Response_Thread
+
+    fields = API_PutThread_Response_Thread.__annotations__
+    return {key: val for key, val in thread.items() if key in fields}
+
+
+def _read_post_journal(path: str, course_id: int) -> dict[str, API_Thread_WithUser]:
+    """
+    Read the threads recorded in a `post_threads` journal for the given course,
+    keyed by their idempotency keys.
+
+    Lines that can't be parsed (e.g. cut off by a crash) are skipped.
+    """
+    posted: dict[str, API_Thread_WithUser] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("course_id") == course_id:
+                    posted[record["key"]] = record["thread"]
+    except FileNotFoundError:
+        pass
+    return posted
+
+
+def _map_concurrently(
+    func: Callable[[_K], _V],
+    keys: Iterable[_K],
+    *,
+    max_workers: int,
+    ordered: bool,
+    error_message: Callable[[_K], str],
+) -> Iterator[tuple[_K, Union[_V, EdError]]]:
+    """
+    Call `func` on every key through a bounded thread pool,
+    yielding `(key, result)` pairs.
+
+    If `ordered` is True, pairs are yielded in the order of `keys`;
+    otherwise, pairs are yielded as soon as they complete.
+    Only a bounded number of calls are queued at once, so `keys` can be
+    an arbitrarily long (or lazy) iterable.
+
+    Errors raised by `func` (including responses that fail to decode) are yielded
+    as `EdError` results instead of aborting the remaining calls;
+    `error_message(key)` is used as the message for errors that are not
+    already `EdError`s.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    def call(key: _K) -> Union[_V, EdError]:
+        try:
+            return func(key)
+        except EdError as err:
+            return err
+        except (requests.RequestException, ValueError) as err:
+            # network errors, and bodies that fail to decode
+            return EdError({"message": error_message(key), "response": str(err)})
+
+    key_iter = iter(keys)
+    # keep the pool busy without queueing every key up front
+    max_pending = 2 * max_workers
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: deque[tuple[_K, Future]] = deque()
+
+        def fill() -> None:
+            while len(pending) < max_pending:
+                try:
+                    key = next(key_iter)
+                except StopIteration:
+                    return
+                pending.append((key, executor.submit(call, key)))
+
+        try:
+            fill()
+            while pending:
+                if ordered:
+                    key, future = pending.popleft()
+                    result = future.result()
+                else:
+                    wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+                    index = next(
+                        index
+                        for index, (_, future) in enumerate(pending)
+                        if future.done()
+                    )
+                    key, future = pending[index]
+                    del pending[index]
+                    result = future.result()
+
+                fill()
+                yield key, result
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
 class EdAPI:
     """
     Class for Ed API integration.
@@ -83,37 +271,205 @@ class EdAPI:
     This class is responsible for authenticating the user, and for making API calls to the Ed API.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        api_token: Optional[str] = None,
+        *,
+        lazy: bool = False,
+        use_dotenv: bool = True,
+        user_cache_path: Optional[str] = None,
+        user_cache_ttl: float = DEFAULT_USER_CACHE_TTL,
+        cache: Optional[ResponseCache] = None,
+        pool_connections: int = DEFAULT_POOLSIZE,
+        pool_maxsize: int = DEFAULT_POOLSIZE,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        adapter: Optional[BaseAdapter] = None,
+        rate_limit: Optional[float] = None,
+        rate_burst: int = 1,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        json_decoder: Union[str, JSONDecoder] = "json",
+    ):
+        """
+        If `api_token` is given, it is used instead of the `ED_API_TOKEN`
+        environment variable. If `use_dotenv` is False, no `.env` file is searched for.
+
+        By default, the API token is validated immediately through `/api/user`.
+        If `lazy` is True, construction makes no requests at all;
+        an invalid token is instead reported by the first request made.
+
+        If `user_cache_path` is given, the user info retrieved when validating
+        the token is cached in this file for `user_cache_ttl` seconds,
+        and reused to validate the same token without a request.
+
+        If `cache` is given, GET requests to the API are served through it;
+        see `edapi.cache.ResponseCache`.
+
+        All requests share one connection pool per host, each keeping up to
+        `pool_maxsize` connections alive (`pool_connections` hosts are kept at most).
+        When using many threads, `pool_maxsize` should be at least the number of
+        threads, so that connections are reused instead of being thrown away;
+        if `pool_block` is True, threads instead wait for a free connection.
+        If `keep_alive` is False, connections are closed after every request.
+        Pass `adapter` to use a custom transport adapter instead
+        (in which case the pool options are ignored).
+
+        If `rate_limit` is given, at most `rate_limit` requests per second are made
+        (with bursts of up to `rate_burst` requests), across all threads.
+        Requests failing with a retryable status (429, or a 5xx for idempotent
+        requests) are retried up to `max_retries` times with jittered
+        exponential backoff, honoring `Retry-After`; see `edapi.ratelimit`.
+
+        Responses are decoded with `json_decoder`: `"json"` (the standard library),
+        `"orjson"`, `"msgspec"` (which also validates responses against their types,
+        dropping any fields the types don't declare), or a `edapi.decoding.JSONDecoder`
+        instance; see `edapi.decoding`.
+        """
         self.api_token = None
+        self.json_decoder = get_decoder(json_decoder)
         self.session = requests.Session()
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+        if adapter is None:
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+            )
+        self.adapter = adapter
+
+        self.rate_limiter = RateLimiter(rate_limit, burst=rate_burst)
+        transport = RateLimitedAdapter(
+            adapter, self.rate_limiter, max_retries=max_retries
+        )
+        self.session.mount("https://", transport)
+        self.session.mount("http://", transport)
+
+        self._explicit_api_token = api_token
+        self._use_dotenv = use_dotenv
+        self._user_cache_path = user_cache_path
+        self._user_cache_ttl = user_cache_ttl
+
+        self.cache = cache
+        if cache is not None:
+            from .cache import (  # pylint: disable=import-outside-toplevel
+                CachingAdapter,
+            )
+
+            # shares the connection pool with all other requests
+            self.session.mount(API_BASE_URL, CachingAdapter(cache, transport))
+
+        if lazy:
+            self._read_api_token()
+        else:
+            self._load_api_token()
+
+    def _read_api_token(self) -> Optional[str]:
+        """
+        Read the API token, without verifying it; defaults to None if not found.
 
-        self._load_api_token()
+        The token passed to the constructor takes precedence over the
+        environment variable (which may be loaded from a .env file).
+        """
+        if self._explicit_api_token is not None:
+            self.api_token = self._explicit_api_token
+        else:
+            if self._use_dotenv:
+                from dotenv import (  # pylint: disable=import-outside-toplevel
+                    find_dotenv,
+                    load_dotenv,
+                )
+
+                load_dotenv(find_dotenv(usecwd=True))
+            self.api_token = os.getenv(API_TOKEN_ENV_VAR, None)
+
+        if self.api_token is not None:
+            # save session header as well
+            self.session.headers.update(self._auth_header)
+
+        return self.api_token
 
     def _load_api_token(self) -> Optional[API_User_Response]:
         """
-        Read the API token from .env file; defaults to None if not found.
+        Read the API token; defaults to None if not found.
 
-        Utilizes the `/api/user` endpoint to verify the token;
+        Utilizes the `/api/user` endpoint to verify the token
+        (unless the user info for the token is cached);
         returns the response if successful.
         """
-        load_dotenv(find_dotenv(usecwd=True))
-        self.api_token = os.getenv(API_TOKEN_ENV_VAR, None)
-        if self.api_token is None:
+        if self._read_api_token() is None:
             # unable to load API token
             return None
 
-        # save session header as well
-        self.session.headers.update(self._auth_header)
+        cached_user_info = self._read_user_cache()
+        if cached_user_info is not None:
+            return cached_user_info
 
         # authorization check
         try:
-            return self.get_user_info()
+            user_info = self.get_user_info()
         except EdAuthError:
             # invalid api token; don't keep it
             self.api_token = None
+            self._explicit_api_token = None
             self._remove_auth_header()
+            return None
+
+        self._write_user_cache(user_info)
+        return user_info
+
+    @property
+    def _user_cache_key(self) -> str:
+        """
+        Key identifying the current API token in the user cache,
+        without storing the token itself.
+        """
+        return hashlib.sha256(str(self.api_token).encode()).hexdigest()
+
+    def _read_user_cache(self) -> Optional[API_User_Response]:
+        """
+        Read the cached user info for the current API token,
+        if it exists and has not expired.
+        """
+        if self._user_cache_path is None:
+            return None
+
+        try:
+            with open(self._user_cache_path, "r", encoding="utf-8") as cache_file:
+                cached = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+        if (
+            not isinstance(cached, dict)
+            or cached.get("key") != self._user_cache_key
+            or time.time() - cached.get("stored_at", 0) >= self._user_cache_ttl
+        ):
+            return None
+        return cached.get("user_info")
 
-        return None
+    def _write_user_cache(self, user_info: API_User_Response) -> None:
+        """
+        Cache the user info for the current API token, if a cache path is set.
+        """
+        if self._user_cache_path is None:
+            return
+
+        cached = {
+            "key": self._user_cache_key,
+            "stored_at": time.time(),
+            "user_info": user_info,
+        }
+        temp_path = f"{self._user_cache_path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as cache_file:
+                json.dump(cached, cache_file)
+            # replace atomically, so concurrent processes never read a partial file
+            os.replace(temp_path, self._user_cache_path)
+        except OSError:
+            # the cache is only an optimization
+            pass
 
     def login(self):
         """
@@ -135,7 +491,7 @@ class EdAPI:
 
         if user_info is None:
             # only way this is reached is if the token was initially loaded successfully.
-            user_info = self.get_user_info()
+            user_info = self._read_user_cache() or self.get_user_info()
 
         # print login welcome message
         user_dict = user_info["user"]
@@ -146,6 +502,71 @@ class EdAPI:
             f"logged in as {ANSI_GREEN(user_name)} ({ANSI_BLUE(user_email)})",
         )
 
+    def pool_stats(self) -> list[dict[str, Union[str, int]]]:
+        """
+        Report usage of the connection pools, one dict per host.
+
+        Each dict contains the `host`, the number of `requests` made,
+        the number of `connections` opened (a connection is reused
+        for every request beyond the first), the number of `idle` connections
+        kept alive, and the `maxsize` of the pool.
+
+        Returns an empty list if a custom adapter without connection pools is used.
+        """
+        poolmanager = getattr(self.adapter, "poolmanager", None)
+        if poolmanager is None:
+            return []
+
+        stats = []
+        for key in list(poolmanager.pools.keys()):
+            pool = poolmanager.pools.get(key)
+            if pool is None:
+                # evicted in the meantime
+                continue
+            # idle slots in the pool are filled with None until a connection is made
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            stats.append(
+                {
+                    "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                    "requests": pool.num_requests,
+                    "connections": pool.num_connections,
+                    "idle": idle,
+                    "maxsize": pool.pool.maxsize,
+                }
+            )
+        return stats
+
+    def _decode(self, response: requests.Response, response_type: str):
+        """
+        Decode the body of a response of the given type (see `edapi.decoding`).
+        """
+        return self.json_decoder.decode(response.content, response_type)
+
+    def _stream_items(
+        self,
+        url: str,
+        paths: Iterable[JSONPath],
+        error_message: str,
+        *,
+        params: Optional[dict] = None,
+        chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+    ) -> Iterator[tuple[JSONPath, object]]:
+        """
+        Stream a GET response, yielding the `(path, item)` pairs of the items
+        of the arrays at the given paths as they are received (see `edapi.streaming`).
+        """
+        from .streaming import (  # pylint: disable=import-outside-toplevel
+            iter_json_items,
+        )
+
+        with self.session.get(url, params=params, stream=True) as response:
+            if not response.ok:
+                _throw_error(error_message, response.content)
+
+            decode = self.json_decoder.decode
+            for path, item in iter_json_items(response.iter_content(chunk_size), paths):
+                yield path, decode(item)
+
     @property
     def _auth_header(self):
         """
@@ -167,7 +588,7 @@ class EdAPI:
         user_info_url = urljoin(API_BASE_URL, "user")
         response = self.session.get(user_info_url)
         if response.ok:
-            return response.json()
+            return self._decode(response, "user.API_User_Response")
 
         _throw_error("Failed to get user info.", response.content)
 
@@ -202,7 +623,9 @@ class EdAPI:
             },
         )
         if response.ok:
-            response_json: API_ListUserActivity_Response = response.json()
+            response_json: API_ListUserActivity_Response = self._decode(
+                response, "activity.API_ListUserActivity_Response"
+            )
             return response_json.get("items", [])  # default to empty list
 
         _throw_error(
@@ -221,20 +644,167 @@ class EdAPI:
         Offset can be used to list out all of the threads in a course iteratively,
         through pagination.
 
+        GET /api/courses/<course_id>/threads
+        """
+        page = self.list_threads_page(course_id, limit=limit, offset=offset, sort=sort)
+        return page["threads"]
+
+    @_ensure_login
+    def list_threads_page(
+        self,
+        /,
+        course_id: int,
+        *,
+        limit: int = 30,
+        offset: int = 0,
+        sort: str = "new",
+        sort_key: Optional[str] = None,
+    ) -> API_ListThreads_Response:
+        """
+        Retrieve a page of threads, along with the `sort_key` cursor for the page.
+
+        If `sort_key` is given (the `sort_key` of a previously retrieved page),
+        the page continues from that cursor rather than from `offset`;
+        this keeps long walks stable when new threads are posted mid-walk.
+
         GET /api/courses/<course_id>/threads
         """
         list_url = urljoin(API_BASE_URL, f"courses/{course_id}/threads")
-        response = self.session.get(
-            list_url, params={"limit": limit, "offset": offset, "sort": sort}
-        )
+        params = {"limit": limit, "sort": sort}
+        if sort_key:
+            params["sort_key"] = sort_key
+        else:
+            params["offset"] = offset
+
+        response = self.session.get(list_url, params=params)
         if response.ok:
-            response_json: API_ListThreads_Response = response.json()
-            return response_json["threads"]
+            response_json: API_ListThreads_Response = self._decode(
+                response, "threads.API_ListThreads_Response"
+            )
+            return response_json
 
         _throw_error(
             f"Failed to list threads for course {course_id}.", response.content
         )
 
+    @_ensure_login
+    def iter_threads(
+        self,
+        /,
+        course_id: int,
+        *,
+        sort: str = "new",
+        page_size: int = MAX_THREADS_PAGE_SIZE,
+        max_items: Optional[int] = None,
+        stop: Optional[Callable[[API_Thread_WithUser], bool]] = None,
+        sort_key: Optional[str] = None,
+    ) -> Iterator[API_Thread_WithUser]:
+        """
+        Iterate through all threads in a course, fetching pages as needed.
+
+        While a page is being consumed, the next page is fetched in the background,
+        so that iterating through a course is not bottlenecked by round trips.
+
+        Pages are chained through the `sort_key` cursor returned with each page,
+        falling back to offsets if the server does not return a usable cursor.
+        Threads are never yielded twice, even if they shift between pages.
+        Pass `sort_key` to resume a walk from a page retrieved
+        through `list_threads_page`.
+
+        Iteration ends after `max_items` threads have been yielded (if given),
+        or at the first thread for which `stop(thread)` is True (if given);
+        that thread is not yielded.
+        """
+        page_size = max(1, min(page_size, MAX_THREADS_PAGE_SIZE))
+        if max_items is not None and max_items <= 0:
+            return
+
+        def fetch_page(
+            offset: int, page_sort_key: Optional[str]
+        ) -> API_ListThreads_Response:
+            return self.list_threads_page(
+                course_id,
+                limit=page_size,
+                offset=offset,
+                sort=sort,
+                sort_key=page_sort_key,
+            )
+
+        seen_ids: set[int] = set()
+        num_yielded = 0
+        offset = 0
+        use_cursor = True
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            page_cursor = sort_key
+            next_page = executor.submit(fetch_page, offset, page_cursor)
+            try:
+                while next_page is not None:
+                    page = next_page.result()
+                    threads = page["threads"]
+                    new_threads = [
+                        thread for thread in threads if thread["id"] not in seen_ids
+                    ]
+
+                    if not page_cursor:
+                        offset += len(threads)
+                    elif threads and not new_threads:
+                        # the cursor was not honored; continue with offsets instead
+                        use_cursor = False
+                        offset = len(seen_ids)
+
+                    next_cursor = page.get("sort_key") if use_cursor else None
+                    if next_cursor == page_cursor:
+                        # cursor did not advance, so it can't be used for the next page
+                        next_cursor = None
+                    page_cursor = next_cursor
+
+                    next_page = None
+                    if len(threads) >= page_size and (
+                        max_items is None or num_yielded + len(new_threads) < max_items
+                    ):
+                        # prefetch the next page while this one is consumed
+                        next_page = executor.submit(fetch_page, offset, page_cursor)
+
+                    for thread in new_threads:
+                        if stop is not None and stop(thread):
+                            return
+                        seen_ids.add(thread["id"])
+                        yield thread
+                        num_yielded += 1
+                        if max_items is not None and num_yielded >= max_items:
+                            return
+            finally:
+                if next_page is not None:
+                    next_page.cancel()
+
+    @_ensure_login
+    def stream_threads(
+        self,
+        /,
+        course_id: int,
+        *,
+        limit: int = 30,
+        offset: int = 0,
+        sort: str = "new",
+        chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+    ) -> Iterator[API_Thread_WithUser]:
+        """
+        Retrieve a page of threads like `list_threads`, yielding the threads
+        one by one as the response is received, so that only one thread
+        is held in memory at a time.
+
+        GET /api/courses/<course_id>/threads
+        """
+        list_url = urljoin(API_BASE_URL, f"courses/{course_id}/threads")
+        for _, thread in self._stream_items(
+            list_url,
+            [("threads",)],
+            f"Failed to list threads for course {course_id}.",
+            params={"limit": limit, "offset": offset, "sort": sort},
+            chunk_size=chunk_size,
+        ):
+            yield thread
+
     def list_users(self, /, course_id: int) -> list[API_User_WithEmail]:
         """
         Retrieve list of users.
@@ -244,7 +814,9 @@ class EdAPI:
         list_url = urljoin(API_BASE_URL, f"courses/{course_id}/analytics/users")
         response = self.session.get(list_url)
         if response.ok:
-            response_json: API_Analytics_Users_Response = response.json()
+            response_json: API_Analytics_Users_Response = self._decode(
+                response, "analytics.API_Analytics_Users_Response"
+            )
             return response_json["users"]
 
         _throw_error(f"Failed to list users for course {course_id}", response.content)
@@ -259,11 +831,36 @@ class EdAPI:
         thread_url = urljoin(API_BASE_URL, f"threads/{thread_id}")
         response = self.session.get(thread_url)
         if response.ok:
-            response_json: API_GetThread_Response = response.json()
+            response_json: API_GetThread_Response = self._decode(
+                response, "threads.API_GetThread_Response"
+            )
             return response_json["thread"]
 
         _throw_error(f"Failed to get thread {thread_id}.", response.content)
 
+    @_ensure_login
+    def stream_thread_comments(
+        self, thread_id: int, *, chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE
+    ) -> Iterator[tuple[str, API_Thread_Comment]]:
+        """
+        Retrieve the answers and comments of a thread like `get_thread`, yielding
+        `("answer", answer)` and `("comment", comment)` pairs one by one
+        as the response is received, in the order of the response.
+        Top-level answers and comments are yielded with their nested replies;
+        only one of them is held in memory at a time.
+
+        GET /api/threads/<thread_id>
+        """
+        thread_url = urljoin(API_BASE_URL, f"threads/{thread_id}")
+        kinds = {("thread", "answers"): "answer", ("thread", "comments"): "comment"}
+        for path, comment in self._stream_items(
+            thread_url,
+            kinds,
+            f"Failed to get thread {thread_id}.",
+            chunk_size=chunk_size,
+        ):
+            yield kinds[path], comment
+
     @_ensure_login
     def get_course_thread(
         self, course_id: int, thread_number: int
@@ -278,11 +875,62 @@ class EdAPI:
         )
         response = self.session.get(thread_url)
         if response.ok:
-            response_json: API_GetThread_Response = response.json()
+            response_json: API_GetThread_Response = self._decode(
+                response, "threads.API_GetThread_Response"
+            )
             return response_json["thread"]
 
         _throw_error(f"Failed to get thread {thread_number}.", response.content)
 
+    @_ensure_login
+    def get_threads(
+        self,
+        thread_ids: Iterable[int],
+        *,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        ordered: bool = True,
+    ) -> Iterator[tuple[int, Union[API_Thread_WithComments, EdError]]]:
+        """
+        Retrieve the details for many threads, given their ids.
+
+        Requests are made concurrently through a pool of `max_workers` threads.
+        Yields `(thread_id, thread)` pairs, in the order of `thread_ids` if `ordered`
+        is True (default), or as soon as each request completes otherwise.
+
+        Threads that could not be retrieved are yielded as `EdError` values
+        instead of aborting the remaining requests.
+        """
+        return _map_concurrently(
+            self.get_thread,
+            thread_ids,
+            max_workers=max_workers,
+            ordered=ordered,
+            error_message=lambda thread_id: f"Failed to get thread {thread_id}.",
+        )
+
+    @_ensure_login
+    def get_course_threads(
+        self,
+        course_id: int,
+        thread_numbers: Iterable[int],
+        *,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        ordered: bool = True,
+    ) -> Iterator[tuple[int, Union[API_Thread_WithComments, EdError]]]:
+        """
+        Retrieve the details for many threads in a given course,
+        using the thread numbers.
+
+        Yields `(thread_number, thread)` pairs; see `get_threads`.
+        """
+        return _map_concurrently(
+            lambda thread_number: self.get_course_thread(course_id, thread_number),
+            thread_numbers,
+            max_workers=max_workers,
+            ordered=ordered,
+            error_message=lambda thread_number: f"Failed to get thread {thread_number}.",
+        )
+
     @_ensure_login
     def post_thread(
         self, course_id: int, params: PostThreadParams
@@ -297,56 +945,241 @@ class EdAPI:
         thread_url = urljoin(API_BASE_URL, f"courses/{course_id}/threads")
         response = self.session.post(thread_url, json={"thread": params})
         if response.ok:
-            response_json: API_PostThread_Response = response.json()
+            response_json: API_PostThread_Response = self._decode(
+                response, "threads.API_PostThread_Response"
+            )
             return response_json["thread"]
 
         _throw_error(f"Failed to post thread in course {course_id}.", response.content)
 
+    @_ensure_login
+    def post_threads(
+        self,
+        course_id: int,
+        threads: Iterable[
+            tuple[str, Union[PostThreadParams, Callable[[], PostThreadParams]]]
+        ],
+        *,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        journal_path: Optional[str] = None,
+        recent_key: Optional[Callable[[API_Thread_WithUser], Optional[str]]] = None,
+        recent_limit: int = MAX_THREADS_PAGE_SIZE,
+    ) -> Iterator[tuple[str, Union[API_Thread_WithUser, EdError]]]:
+        """
+        Creates many threads in the given course, given `(key, params)` pairs.
+
+        Each thread has a caller-supplied idempotency key (unique within the call),
+        so that rerunning an interrupted batch skips threads that were already created:
+        - if `journal_path` is given, every created thread is appended to a JSON lines
+          journal at that path, and keys recorded in the journal are skipped
+        - if `recent_key` is given, it is called on the `recent_limit` most recent
+          threads in the course, and keys it returns are skipped
+
+        Params can also be given as a function returning them, which is only called
+        for threads that are not skipped (e.g. to upload their images only once).
+
+        Requests are made concurrently through a pool of `max_workers` threads.
+        Yields `(key, thread)` pairs in the order of `threads`; skipped keys are
+        yielded with their existing thread. Threads that could not be created are
+        yielded as `EdError` values instead of aborting the remaining requests.
+        """
+        existing: dict[str, API_Thread_WithUser] = {}
+        if recent_key is not None and recent_limit > 0:
+            for thread in self.iter_threads(
+                course_id, sort="new", max_items=recent_limit
+            ):
+                key = recent_key(thread)
+                if key is not None:
+                    existing.setdefault(key, thread)
+        if journal_path is not None:
+            existing.update(_read_post_journal(journal_path, course_id))
+
+        journal_lock = threading.Lock()
+        pending_params: dict[
+            str, Union[PostThreadParams, Callable[[], PostThreadParams]]
+        ] = {}
+
+        def keys() -> Iterator[str]:
+            seen = set()
+            for key, params in threads:
+                if key in seen:
+                    raise ValueError(f"Duplicate idempotency key {key!r}")
+                seen.add(key)
+                if key not in existing:
+                    pending_params[key] = params
+                yield key
+
+        def post(key: str) -> API_Thread_WithUser:
+            if key in existing:
+                return existing[key]
+
+            params = pending_params.pop(key)
+            if callable(params):
+                params = params()
+            thread = self.post_thread(course_id, params)
+            if journal_path is not None:
+                record = {"course_id": course_id, "key": key, "thread": thread}
+                with journal_lock, open(journal_path, "a", encoding="utf-8") as journal:
+                    journal.write(json.dumps(record) + "\n")
+            return thread
+
+        return _map_concurrently(
+            post,
+            keys(),
+            max_workers=max_workers,
+            ordered=True,
+            error_message=lambda key: f"Failed to post thread {key!r}.",
+        )
+
     @_ensure_login
     def edit_thread(
-        self, thread_id: int, params: EditThreadParams, unlock_thread=True
+        self,
+        thread_id: int,
+        params: EditThreadParams,
+        unlock_thread=True,
+        *,
+        thread: Optional[API_Thread] = None,
+        max_conflict_retries: int = DEFAULT_MAX_CONFLICT_RETRIES,
     ) -> API_PutThread_Response_Thread:
         """
         Edit the details for a given thread.
 
         If `unlock_thread` is True (default), then the thread is unlocked
-        before editing. Otherwise, if `unlock_thread` is False, no attempt
-        to unlock the thread will be made, and the edit request will fail.
+        before editing (and locked again afterwards). Otherwise, if `unlock_thread`
+        is False, no attempt to unlock the thread will be made, and the edit
+        request will fail.
+
+        If the params would not change the thread, no edit is made at all
+        (the thread is not unlocked either), and the current thread is returned,
+        with the same fields as the response of an edit.
+        Only the fields changed by the params are sent in the edit request,
+        so fields edited by others in the meantime are left as they are.
+
+        If `thread` is given (a thread object previously retrieved for this thread),
+        it is used as a snapshot of the current thread instead of retrieving it,
+        making the edit a single request (or three, for a locked thread).
+        Changes are computed against the snapshot, and no precondition is sent
+        with the edit: fields changed by the params are last-writer-wins,
+        overwriting any edit made to the same fields since the snapshot.
+        If the edit is rejected, the thread is retrieved again, and the edit is
+        retried only if the fresh copy explains the rejection: if the thread has been
+        locked since the snapshot (and `unlock_thread` is True), it is unlocked and
+        the edit is retried, up to `max_conflict_retries` times. If the fresh copy
+        already has the changes, it is returned without editing.
 
         PUT /api/threads/<thread_id>
 
         Returns newly created thread object.
         """
 
-        thread = self.get_thread(thread_id)
+        if thread is None:
+            is_snapshot = False
+            thread = self.get_thread(thread_id)
+        else:
+            is_snapshot = True
+            # don't modify the caller's copy
+            thread = dict(thread)
+
+        if not _thread_changes(thread, params):
+            return _as_put_thread(thread)
 
         relock = False
         if unlock_thread and thread["is_locked"]:
             # locked thread, so unlock it and re-lock at the very end
             relock = True
             self.unlock_thread(thread_id)
-            # fetch thread again in case any side-effects happen
-            thread = self.get_thread(thread_id)
-
-        # set items
-        for key, val in params.items():
-            # ensure we're only modifying values that have appeared in the existing thread object
-            if key in thread and val is not None:
-                thread[key] = val
+            if is_snapshot:
+                thread["is_locked"] = False
+            else:
+                # fetch thread again in case any side-effects happen
+                thread = self.get_thread(thread_id)
 
         thread_url = urljoin(API_BASE_URL, f"threads/{thread_id}")
-        request_json: API_PutThread_Request = {"thread": thread}
-        response = self.session.put(thread_url, json=request_json)
-        if response.ok:
-            response_json: API_PutThread_Response = response.json()
-
+        try:
+            conflict_retries = 0
+            while True:
+                # only send the changed fields, so that fields edited by others
+                # since the thread was retrieved are not overwritten
+                changes = {
+                    key: val
+                    for key, val in _thread_changes(thread, params).items()
+                    if key in EDITABLE_THREAD_FIELDS
+                }
+                thread.update(changes)
+
+                request_json: API_PutThread_Request = {"thread": changes}
+                response = self.session.put(thread_url, json=request_json)
+                if response.ok:
+                    response_json: API_PutThread_Response = self._decode(
+                        response, "threads.API_PutThread_Response"
+                    )
+                    edited_thread = response_json["thread"]
+                    break
+
+                if not is_snapshot or conflict_retries >= max_conflict_retries:
+                    _throw_error(
+                        f"Failed to edit thread {thread_id}.", response.content
+                    )
+
+                # the edit isn't checked against the snapshot, so a stale snapshot
+                # only explains the rejection if the thread was locked since
+                current_thread = self.get_thread(thread_id)
+                if not _thread_changes(current_thread, params):
+                    # someone else already made the same changes
+                    edited_thread = _as_put_thread(current_thread)
+                    break
+                if not (unlock_thread and current_thread["is_locked"]):
+                    _throw_error(
+                        f"Failed to edit thread {thread_id}.", response.content
+                    )
+
+                relock = True
+                self.unlock_thread(thread_id)
+                current_thread["is_locked"] = False
+                thread = current_thread
+                conflict_retries += 1
+        finally:
             if relock:
                 # relock thread if necessary
                 self.lock_thread(thread_id)
 
-            return response_json["thread"]
+        if relock:
+            # the thread was locked again before returning
+            edited_thread["is_locked"] = True
+        return edited_thread
+
+    def edit_session(
+        self,
+        thread_id: int,
+        *,
+        thread: Optional[API_Thread] = None,
+        flush_interval: Optional[float] = None,
+        unlock_thread: bool = True,
+    ) -> ThreadEditSession:
+        """
+        Start a session coalescing many edits to a thread into a single edit.
+
+        Edits are queued in memory, and flushed as one `edit_thread` call
+        when the session is exited (or after `flush_interval` seconds, if given):
 
-        _throw_error(f"Failed to edit thread {thread_id}.", response.content)
+            with ed.edit_session(thread_id) as session:
+                session.mutate_content(add_first_item)
+                session.mutate_content(add_second_item)
+
+        If `thread` is given, it is used as a snapshot of the current thread;
+        see `edit_thread`. See `edapi.edit_session.ThreadEditSession`.
+        """
+        from .edit_session import (  # pylint: disable=import-outside-toplevel
+            ThreadEditSession,
+        )
+
+        return ThreadEditSession(
+            self,
+            thread_id,
+            thread=thread,
+            flush_interval=flush_interval,
+            unlock_thread=unlock_thread,
+        )
 
     @_ensure_login
     def upload_file(self, filename: str, file: bytes, content_type: str) -> str:
@@ -366,12 +1199,235 @@ class EdAPI:
         formdata = {"attachment": (filename, file, content_type)}
         response = self.session.post(upload_url, files=formdata)
         if response.ok:
-            response_json: API_PostFile_Response = response.json()
+            response_json: API_PostFile_Response = self._decode(
+                response, "files.API_PostFile_Response"
+            )
+            file_id = response_json["file"]["id"]
+            return urljoin(STATIC_FILE_BASE_URL, file_id)
+
+        _throw_error(f"Failed to upload file {filename}.", response.content)
+
+    @_ensure_login
+    def upload_file_stream(
+        self,
+        file: FileSource,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+        *,
+        progress: Optional[ProgressCallback] = None,
+        chunk_size: Optional[int] = None,
+    ) -> str:
+        """
+        Upload a file to Ed, streaming it from a path or a (seekable) binary file object
+        in chunks of `chunk_size` bytes (1 MiB by default),
+        so memory use doesn't grow with the file size.
+
+        `filename` defaults to the name of the file, and `content_type`
+        is guessed from the filename if not given. If given, `progress` is called
+        with the number of bytes sent so far and the total number of bytes.
+
+        POST /api/files
+
+        Returns the static URL for the uploaded file.
+        """
+        from .upload import (  # pylint: disable=import-outside-toplevel
+            MultipartStream,
+            guess_content_type,
+            open_file_source,
+        )
+
+        chunk_kwargs = {} if chunk_size is None else {"chunk_size": chunk_size}
+        fileobj, filename, owned = open_file_source(file, filename)
+        try:
+            body = MultipartStream(
+                "attachment",
+                filename,
+                fileobj,
+                content_type or guess_content_type(filename),
+                progress=progress,
+                **chunk_kwargs,
+            )
+            try:
+                upload_url = urljoin(API_BASE_URL, "files")
+                response = self.session.post(
+                    upload_url,
+                    data=body,
+                    headers={"Content-Type": body.content_type},
+                )
+            finally:
+                body.close()
+        finally:
+            if owned:
+                fileobj.close()
+
+        if response.ok:
+            response_json: API_PostFile_Response = self._decode(
+                response, "files.API_PostFile_Response"
+            )
             file_id = response_json["file"]["id"]
             return urljoin(STATIC_FILE_BASE_URL, file_id)
 
         _throw_error(f"Failed to upload file {filename}.", response.content)
 
+    @_ensure_login
+    def upload_image(
+        self,
+        file: FileSource,
+        filename: Optional[str] = None,
+        *,
+        progress: Optional[ProgressCallback] = None,
+    ) -> str:
+        """
+        Upload a PNG, JPEG, GIF or WebP image to Ed, given its path or a (seekable)
+        binary file object, and embed it in a document fragment.
+
+        The image size is read from the image header, without decoding it;
+        the image is then streamed as in `upload_file_stream`.
+
+        Returns the `<figure><image src="..." width="..." height="..."/></figure>`
+        fragment for the uploaded image.
+        """
+        from .image import (  # pylint: disable=import-outside-toplevel
+            image_figure,
+            probe_image,
+        )
+        from .upload import (  # pylint: disable=import-outside-toplevel
+            open_file_source,
+        )
+
+        fileobj, filename, owned = open_file_source(file, filename)
+        try:
+            info = probe_image(fileobj)
+            url = self.upload_file_stream(
+                fileobj, filename, info["content_type"], progress=progress
+            )
+        finally:
+            if owned:
+                fileobj.close()
+
+        return image_figure(url, info["width"], info["height"])
+
+    @_ensure_login
+    def upload_files(
+        self,
+        files: Iterable[FileSource],
+        *,
+        index: Union[UploadIndex, str, None] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        ordered: bool = True,
+    ) -> Iterator[tuple[FileSource, Union[str, EdError]]]:
+        """
+        Upload many files to Ed, given their paths or (named, seekable) file objects,
+        skipping files whose contents were already uploaded.
+
+        Files are identified by the SHA-256 hash of their contents; `index`
+        (an `UploadIndex`, or the path of its JSON lines file) maps hashes to the
+        static URLs of uploaded files, and is updated with every new upload.
+        Without an index, only identical files within this batch are deduplicated.
+
+        Uploads are streamed (see `upload_file_stream`), and made concurrently
+        through a pool of `max_workers` threads. Yields `(file, url)` pairs,
+        in the order of `files` if `ordered` is True (default), or as soon as each
+        upload completes otherwise. Files that could not be uploaded are yielded
+        as `EdError` values instead of aborting the remaining uploads.
+        """
+        from .upload import (  # pylint: disable=import-outside-toplevel
+            UploadIndex,
+            file_digest,
+        )
+
+        if not isinstance(index, UploadIndex):
+            index = UploadIndex(index)
+
+        # uploads in progress, so identical files in the batch are only uploaded once
+        in_flight: dict[str, Future] = {}
+        in_flight_lock = threading.Lock()
+
+        def upload(file: FileSource) -> str:
+            digest = file_digest(file)
+            with in_flight_lock:
+                url = index.get(digest)
+                if url is not None:
+                    return url
+                future = in_flight.get(digest)
+                if future is not None:
+                    is_owner = False
+                else:
+                    future = in_flight[digest] = Future()
+                    is_owner = True
+            if not is_owner:
+                return future.result()
+
+            try:
+                url = self.upload_file_stream(file)
+            except BaseException as err:
+                with in_flight_lock:
+                    del in_flight[digest]
+                future.set_exception(err)
+                raise
+            # record the upload before it stops being in progress
+            index.add(digest, url)
+            with in_flight_lock:
+                del in_flight[digest]
+            future.set_result(url)
+            return url
+
+        return _map_concurrently(
+            upload,
+            files,
+            max_workers=max_workers,
+            ordered=ordered,
+            error_message=lambda file: f"Failed to upload file {file}.",
+        )
+
+    @_ensure_login
+    def upload_file_url(self, url: str) -> str:
+        """
+        Upload a file to Ed from a public URL; the file is retrieved by Ed's servers,
+        without passing through this client.
+
+        POST /api/files/url
+
+        Returns the static URL for the uploaded file.
+        """
+        upload_url = urljoin(API_BASE_URL, "files/url")
+        request: API_PostFileUrl_Request = {"url": url}
+        response = self.session.post(upload_url, json=request)
+        if response.ok:
+            response_json: API_PostFile_Response = self._decode(
+                response, "files.API_PostFile_Response"
+            )
+            file_id = response_json["file"]["id"]
+            return urljoin(STATIC_FILE_BASE_URL, file_id)
+
+        _throw_error(f"Failed to upload file from {url}.", response.content)
+
+    @_ensure_login
+    def upload_file_urls(
+        self,
+        urls: Iterable[str],
+        *,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        ordered: bool = True,
+    ) -> Iterator[tuple[str, Union[str, EdError]]]:
+        """
+        Upload many files to Ed from public URLs; see `upload_file_url`.
+
+        Requests are made concurrently through a pool of `max_workers` threads.
+        Yields `(url, static_url)` pairs, in the order of `urls` if `ordered`
+        is True (default), or as soon as each request completes otherwise.
+
+        Files that could not be uploaded are yielded as `EdError` values
+        instead of aborting the remaining requests.
+        """
+        return _map_concurrently(
+            self.upload_file_url,
+            urls,
+            max_workers=max_workers,
+            ordered=ordered,
+            error_message=lambda url: f"Failed to upload file from {url}.",
+        )
+
     @_ensure_login
     def lock_thread(self, thread_id: int) -> None:
         """
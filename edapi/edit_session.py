@@ -0,0 +1,165 @@
+"""
+Write-behind edit sessions, coalescing many edits to a thread into a single request.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from .edapi import EdAPI
+    from .types import EditThreadParams
+    from .types.api_types.endpoints.threads import API_PutThread_Response_Thread
+    from .types.api_types.thread import API_Thread
+
+ContentMutation = Callable[[str], str]
+
+
+class ThreadEditSession:
+    """
+    Queues edits to a single thread in memory, and flushes them as one edit.
+
+    Edits are queued through `update` (new values for thread fields) and
+    `mutate_content` (functions transforming the thread content); they are applied
+    in order on top of the latest copy of the thread when flushed.
+
+    Pending edits are flushed through `flush`, when the session is exited
+    without an exception, and (if `flush_interval` is given) in the background
+    at most `flush_interval` seconds after the first pending edit was queued.
+    If a background flush fails, the error is stored in `last_error`,
+    and the edits stay pending until the next flush.
+
+    Create sessions through `EdAPI.edit_session`.
+    """
+
+    def __init__(
+        self,
+        ed: EdAPI,
+        thread_id: int,
+        *,
+        thread: Optional[API_Thread] = None,
+        flush_interval: Optional[float] = None,
+        unlock_thread: bool = True,
+    ):
+        self.ed = ed
+        self.thread_id = thread_id
+        self.flush_interval = flush_interval
+        self.unlock_thread = unlock_thread
+
+        # latest known copy of the thread, retrieved on the first flush if not given
+        self.thread: Optional[API_Thread] = dict(thread) if thread else None
+        self.flush_count = 0
+        self.last_error: Optional[Exception] = None
+
+        self._pending_params: EditThreadParams = {}
+        self._pending_mutations: list[ContentMutation] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> ThreadEditSession:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.flush()
+        else:
+            # don't write partial edits
+            self.discard()
+
+    @property
+    def has_pending(self) -> bool:
+        """
+        Whether there are edits that have not been flushed yet.
+        """
+        with self._lock:
+            return bool(self._pending_params or self._pending_mutations)
+
+    def update(self, params: EditThreadParams) -> None:
+        """
+        Queue new values for thread fields; see `EdAPI.edit_thread`.
+
+        A new `content` value replaces any content mutations queued before it.
+        """
+        with self._lock:
+            if params.get("content") is not None:
+                self._pending_mutations.clear()
+            self._pending_params.update(params)
+            self._schedule_flush()
+
+    def mutate_content(self, mutation: ContentMutation) -> None:
+        """
+        Queue a function transforming the thread content (a document string)
+        into new content.
+        """
+        with self._lock:
+            self._pending_mutations.append(mutation)
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """
+        Start the flush timer, if a flush interval is set and none is running.
+        """
+        if self.flush_interval is None or self._timer is not None:
+            return
+        self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _timed_flush(self) -> None:
+        """
+        Flush from the timer thread, keeping any error for the caller.
+        """
+        try:
+            self.flush()
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            self.last_error = err
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def discard(self) -> None:
+        """
+        Drop all pending edits without flushing them.
+        """
+        with self._lock:
+            self._cancel_timer()
+            self._pending_params = {}
+            self._pending_mutations = []
+
+    def flush(self) -> Optional[API_PutThread_Response_Thread]:
+        """
+        Apply all pending edits to the thread as a single edit.
+
+        Returns the edited thread, or None if there were no pending edits.
+        """
+        with self._lock:
+            self._cancel_timer()
+            if not self.has_pending:
+                return None
+
+            if self.thread is None:
+                self.thread = self.ed.get_thread(self.thread_id)
+
+            params: EditThreadParams = dict(self._pending_params)
+            if self._pending_mutations:
+                content: str = params.get("content") or self.thread["content"]
+                for mutation in self._pending_mutations:
+                    content = mutation(content)
+                params["content"] = content
+
+            result = self.ed.edit_thread(
+                self.thread_id,
+                params,
+                unlock_thread=self.unlock_thread,
+                thread=self.thread,
+            )
+
+            # keep the snapshot up to date for the next flush
+            self.thread.update(result)
+            self._pending_params = {}
+            self._pending_mutations = []
+            self.flush_count += 1
+            return result
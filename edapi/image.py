@@ -0,0 +1,132 @@
+"""
+Image size probing from file headers, without decoding any pixel data.
+
+Supports PNG, JPEG, GIF and WebP images.
+"""
+
+import html
+import struct
+from typing import BinaryIO, TypedDict
+
+# JPEG start-of-frame markers, which hold the image size
+# (0xC4, 0xC8 and 0xCC are other markers in the same range)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# JPEG markers without a length field (RST0-7 and TEM; SOI and EOI are handled apart)
+_JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xD8)) | {0x01}
+_JPEG_SOI_MARKER = 0xD8
+_JPEG_EOI_MARKER = 0xD9
+# start of the entropy-coded data, which always follows the start-of-frame segment
+_JPEG_SOS_MARKER = 0xDA
+
+
+class ImageInfo(TypedDict):
+    """
+    Format and size of an image, as read from its header.
+    """
+
+    content_type: str
+    width: int
+    height: int
+
+
+def _read_exact(fileobj: BinaryIO, size: int) -> bytes:
+    """
+    Read exactly `size` bytes, raising ValueError if the file ends first.
+    """
+    data = fileobj.read(size)
+    if len(data) != size:
+        raise ValueError("image header is truncated")
+    return data
+
+
+def _probe_jpeg(fileobj: BinaryIO) -> tuple[int, int]:
+    """
+    Find the image size in the start-of-frame segment of a JPEG image,
+    skipping over all segments before it.
+    """
+    while True:
+        byte = _read_exact(fileobj, 1)
+        if byte != b"\xff":
+            raise ValueError("invalid JPEG marker")
+        # markers can be preceded by any number of fill bytes
+        marker = _read_exact(fileobj, 1)[0]
+        while marker == 0xFF:
+            marker = _read_exact(fileobj, 1)[0]
+
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker == _JPEG_SOI_MARKER:
+            raise ValueError("invalid JPEG marker")
+        if marker in (_JPEG_EOI_MARKER, _JPEG_SOS_MARKER):
+            raise ValueError("JPEG image has no start-of-frame segment")
+
+        (length,) = struct.unpack(">H", _read_exact(fileobj, 2))
+        if marker in _JPEG_SOF_MARKERS:
+            _precision, height, width = struct.unpack(">BHH", _read_exact(fileobj, 5))
+            return width, height
+        fileobj.seek(length - 2, 1)
+
+
+def _probe_webp(header: bytes) -> tuple[int, int]:
+    """
+    Read the canvas size from the first chunk of a WebP image
+    (the first 30 bytes of the file).
+    """
+    chunk = header[12:16]
+    if chunk == b"VP8 ":
+        # lossy; 14-bit sizes after the frame tag and start code
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        # lossless; 14-bit sizes (minus one) after the signature byte
+        (bits,) = struct.unpack("<I", header[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        # extended; 24-bit canvas sizes (minus one) after the flags
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return width, height
+    raise ValueError("unsupported WebP image")
+
+
+def probe_image(fileobj: BinaryIO) -> ImageInfo:
+    """
+    Read the format and size of an image from its header, reading only as much
+    of the file as needed; the file is left at its original position.
+
+    Raises ValueError if the image is not a PNG, JPEG, GIF or WebP image.
+    """
+    start = fileobj.tell()
+    try:
+        header = fileobj.read(30)
+        if header.startswith(b"\x89PNG\r\n\x1a\n") and header[12:16] == b"IHDR":
+            content_type = "image/png"
+            width, height = struct.unpack(">II", header[16:24])
+        elif header[:6] in (b"GIF87a", b"GIF89a"):
+            content_type = "image/gif"
+            width, height = struct.unpack("<HH", header[6:10])
+        elif header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+            content_type = "image/webp"
+            width, height = _probe_webp(header)
+        elif header.startswith(b"\xff\xd8"):
+            content_type = "image/jpeg"
+            fileobj.seek(start + 2)
+            width, height = _probe_jpeg(fileobj)
+        else:
+            raise ValueError("unsupported image format")
+    except struct.error as err:
+        raise ValueError("image header is truncated") from err
+    finally:
+        fileobj.seek(start)
+
+    return {"content_type": content_type, "width": width, "height": height}
+
+
+def image_figure(src: str, width: int, height: int) -> str:
+    """
+    Document fragment embedding an image: `<figure><image .../></figure>`.
+    """
+    return (
+        f'<figure><image src="{html.escape(src)}"'
+        f' width="{width}" height="{height}"/></figure>'
+    )
@@ -0,0 +1,284 @@
+"""
+Compact `__slots__` models for threads, comments, users and courses.
+
+The API returns plain dicts; when many of them are kept around (e.g. every thread
+of a large course), converting them to these models uses about a third of the
+memory (2.9x less for threads in `benchmarks/models_memory.py`).
+Models are read-only mappings over their fields,
+so code indexing into the dicts (`thread["title"]`) works unchanged;
+`to_dict` converts them back to plain dicts when needed.
+"""
+
+from __future__ import annotations
+
+import sys
+from collections.abc import Mapping
+from typing import Any, ClassVar, Iterable, Iterator, TypeVar
+
+from .types.api_types.course import API_Course, API_Course_Features
+from .types.api_types.thread import (
+    API_Thread_Comment,
+    API_Thread_WithComments,
+    API_Thread_WithUser,
+)
+from .types.api_types.user import API_User_Short
+
+_M = TypeVar("_M", bound="Model")
+
+# marks unset fields; getattr on an unset slot raises AttributeError
+_MISSING = object()
+
+
+def _keys(*typed_dicts: type) -> tuple[str, ...]:
+    """
+    Field names of the given TypedDicts (including inherited fields), in order.
+    """
+    return tuple(
+        dict.fromkeys(
+            key for typed_dict in typed_dicts for key in typed_dict.__annotations__
+        )
+    )
+
+
+class Model(Mapping):
+    """
+    Base class for the models; each subclass stores the fields of a TypedDict in slots.
+
+    Class attributes of subclasses:
+    - `_fields`: field names, in order (also the slots)
+    - `_interned`: string fields with few distinct values, interned so that
+      all models share a single copy of each value
+    - `_shared`: fields whose values often repeat within a response (ids of
+      the course and of users, timestamps); equal values converted together
+      share a single object
+    - `_nested`: fields holding other models, as `(model class, is list)`
+
+    Fields missing from the source dict are left unset, and fields not known
+    to the model are kept in a dict, so `to_dict` gives back the original dict;
+    only models with such fields have a slot for that dict (they are instances
+    of a subclass of their model class, `_with_extra`).
+    """
+
+    __slots__ = ()
+
+    _fields: ClassVar[tuple[str, ...]] = ()
+    _field_set: ClassVar[frozenset[str]] = frozenset()
+    _interned: ClassVar[frozenset[str]] = frozenset()
+    _shared: ClassVar[frozenset[str]] = frozenset()
+    _nested: ClassVar[dict[str, tuple[type[Model], bool]]] = {}
+    _with_extra: ClassVar[type[Model]]
+
+    # fields not known to the model; a slot in `_with_extra` subclasses only
+    _extra: dict[str, Any] | None = None
+
+    def __init_subclass__(cls, extra: bool = False, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if extra:
+            return
+        cls._field_set = frozenset(cls._fields)
+        cls._with_extra = type(
+            cls.__name__,
+            (cls,),
+            {"__slots__": ("_extra",), "__module__": cls.__module__},
+            extra=True,
+        )
+
+    @classmethod
+    def _new(cls: type[_M], data: Mapping[str, Any]) -> _M:
+        """
+        Create an empty model for a dict, with a slot for unknown fields if needed.
+        """
+        if data.keys() <= cls._field_set:
+            return cls.__new__(cls)
+        return cls._with_extra.__new__(cls._with_extra)
+
+    @classmethod
+    def from_dict(cls: type[_M], data: Mapping[str, Any]) -> _M:
+        """
+        Convert a dict from the API into a model, including any nested models.
+
+        Nested models are converted iteratively, so deeply nested comment trees
+        don't hit the recursion limit.
+        """
+        return cls._from_dict(data, {})
+
+    @classmethod
+    def _from_dict(cls: type[_M], data: Mapping[str, Any], shared: dict) -> _M:
+        """
+        Convert a dict into a model, sharing the values of `_shared` fields
+        through `shared` (equal values map to the first value seen).
+        """
+        root = cls._new(data)
+        # (model to fill, source dict)
+        stack: list[tuple[Model, Mapping[str, Any]]] = [(root, data)]
+        pop = stack.pop
+        push = stack.append
+        intern = sys.intern
+        share = shared.setdefault
+        while stack:
+            model, values = pop()
+            fields = model._field_set
+            interned = model._interned
+            shared_fields = model._shared
+            nested = model._nested
+            extra = None
+            for key, value in values.items():
+                if key not in fields:
+                    if extra is None:
+                        extra = {}
+                    extra[key] = value
+                    continue
+                # pylint: disable=unidiomatic-typecheck
+                if key in interned:
+                    if type(value) is str:
+                        value = intern(value)
+                elif key in shared_fields:
+                    # exact types, so that e.g. True is not shared with 1
+                    if type(value) is str or type(value) is int:
+                        value = share(value, value)
+                elif key in nested and value is not None:
+                    model_cls, many = nested[key]
+                    if many:
+                        children = [model_cls._new(item) for item in value]
+                        stack.extend(zip(children, value))
+                        value = children
+                    else:
+                        child = model_cls._new(value)
+                        push((child, value))
+                        value = child
+                setattr(model, key, value)
+            if extra is not None:
+                model._extra = extra
+        return root
+
+    @classmethod
+    def from_dicts(cls: type[_M], data: Iterable[Mapping[str, Any]]) -> list[_M]:
+        """
+        Convert a list of dicts from the API into a list of models,
+        sharing repeated values (e.g. timestamps and user ids) between them.
+        """
+        from_dict = cls._from_dict
+        shared: dict = {}
+        return [from_dict(item, shared) for item in data]
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Convert the model back into a plain dict, including any nested models.
+        """
+        root: dict[str, Any] = {}
+        # (model to convert, dict to fill)
+        stack: list[tuple[Model, dict[str, Any]]] = [(self, root)]
+        while stack:
+            model, data = stack.pop()
+            nested = model._nested
+            for key in model._fields:
+                value = getattr(model, key, _MISSING)
+                if value is _MISSING:
+                    continue
+                if key in nested and value is not None:
+                    if nested[key][1]:
+                        children = [{} for _ in value]
+                        stack.extend(zip(value, children))
+                        value = children
+                    else:
+                        child: dict[str, Any] = {}
+                        stack.append((value, child))
+                        value = child
+                data[key] = value
+            if model._extra:
+                data.update(model._extra)
+        return root
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._field_set:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._fields:
+            if hasattr(self, key):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.get('id')!r})"
+
+
+class User(Model):
+    """
+    Model for `API_User_Short`, as included in threads.
+    """
+
+    __slots__ = _fields = _keys(API_User_Short)
+    _interned = frozenset({"avatar", "course_role", "name", "role"})
+    _shared = frozenset({"id"})
+
+
+class Comment(Model):
+    """
+    Model for `API_Thread_Comment`, with its replies as nested models.
+    """
+
+    __slots__ = _fields = _keys(API_Thread_Comment)
+    _interned = frozenset({"type", "kind"})
+    _shared = frozenset(
+        {
+            "user_id",
+            "course_id",
+            "thread_id",
+            "parent_id",
+            "editor_id",
+            "created_at",
+            "updated_at",
+        }
+    )
+
+
+Comment._nested = {"comments": (Comment, True)}
+
+
+class Thread(Model):
+    """
+    Model for `API_Thread`, with the optional `user` (`API_Thread_WithUser`)
+    and `answers` and `comments` (`API_Thread_WithComments`) fields as nested models.
+    """
+
+    __slots__ = _fields = _keys(API_Thread_WithComments, API_Thread_WithUser)
+    _interned = frozenset(
+        {"type", "category", "subcategory", "subsubcategory", "approved_status"}
+    )
+    _shared = frozenset(
+        {"user_id", "course_id", "editor_id", "created_at", "updated_at", "glanced_at"}
+    )
+    _nested = {
+        "user": (User, False),
+        "answers": (Comment, True),
+        "comments": (Comment, True),
+    }
+
+
+class CourseFeatures(Model):
+    """
+    Model for `API_Course_Features`.
+    """
+
+    __slots__ = _fields = _keys(API_Course_Features)
+    _interned = frozenset({"admin"})
+
+
+class Course(Model):
+    """
+    Model for `API_Course`; `settings` is kept as a plain dict.
+    """
+
+    __slots__ = _fields = _keys(API_Course)
+    _interned = frozenset({"code", "name", "year", "session", "status"})
+    _nested = {"features": (CourseFeatures, False)}
@@ -0,0 +1,222 @@
+"""
+Client-side rate limiting and retries for requests to the Ed API.
+
+All requests of an `EdAPI` instance share one `RateLimiter` (a token bucket);
+responses that are safe to retry are retried with jittered exponential backoff,
+honoring the `Retry-After` header, and rate limit responses (`429`) also slow down
+the limiter for every other request.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import Timeout
+from requests.models import PreparedRequest, Response
+
+# default number of retries for failed requests
+DEFAULT_MAX_RETRIES = 3
+# base and maximum delay (in seconds) between retries
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 30.0
+
+# statuses that are always safe to retry; the request was not processed
+RETRY_ALWAYS_STATUSES = frozenset({429})
+# statuses that are only retried for idempotent requests
+RETRY_IDEMPOTENT_STATUSES = frozenset({500, 502, 503, 504})
+# methods that can be repeated without side effects beyond the first request
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket, allowing `rate` requests per second
+    with bursts of up to `burst` requests.
+
+    If `rate` is None, requests are not limited, but the limiter can still be
+    paused (e.g. after a `Retry-After` header) for all requests at once.
+
+    On rate limit responses, the rate is halved (down to `min_rate`),
+    and it recovers gradually as requests succeed.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        *,
+        burst: int = 1,
+        min_rate: Optional[float] = None,
+    ):
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else (rate or 0) / 16
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Wait until a request is allowed to be made.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self.rate is None:
+                        return
+
+                    self._tokens = min(
+                        self.burst,
+                        self._tokens + (now - self._last_refill) * self.rate,
+                    )
+                    self._last_refill = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold all requests for the given number of seconds.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def slow_down(self) -> None:
+        """
+        Halve the rate, after the server rejected a request for exceeding its limit.
+        """
+        with self._lock:
+            if self.rate is not None:
+                self.rate = max(self.min_rate, self.rate / 2)
+
+    def speed_up(self) -> None:
+        """
+        Recover part of the rate, after a successful request.
+        """
+        with self._lock:
+            if self.rate is not None and self.max_rate is not None:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a `Retry-After` header (in seconds, or as an HTTP date)
+    into the number of seconds to wait; returns None if missing or invalid.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def is_retryable(method: Optional[str], status_code: int) -> bool:
+    """
+    Whether a response with the given status can be retried for the given method.
+    """
+    if status_code in RETRY_ALWAYS_STATUSES:
+        return True
+    return status_code in RETRY_IDEMPOTENT_STATUSES and method in IDEMPOTENT_METHODS
+
+
+class RateLimitedAdapter(BaseAdapter):
+    """
+    Transport adapter that passes every request through a `RateLimiter`,
+    and retries failed requests, delegating all network traffic
+    to the wrapped `adapter`.
+
+    Retries use full-jitter exponential backoff (a random delay up to
+    `backoff_base * 2 ** attempt`, capped at `backoff_max`), unless the server
+    gives a `Retry-After` header; responses asking to wait longer than `backoff_max`
+    are returned as is. Requests with a streamed body are never retried.
+    """
+
+    def __init__(
+        self,
+        adapter: BaseAdapter,
+        limiter: Optional[RateLimiter] = None,
+        *,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+    ):
+        super().__init__()
+        self.adapter = adapter
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _backoff(self, attempt: int) -> float:
+        """
+        Jittered delay before the given retry attempt (starting at 0).
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        # streamed bodies are consumed while sending, so they can't be sent again
+        replayable = request.body is None or isinstance(request.body, (bytes, str))
+
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                response = self.adapter.send(request, **kwargs)
+            except (RequestsConnectionError, Timeout):
+                if (
+                    not replayable
+                    or request.method not in IDEMPOTENT_METHODS
+                    or attempt >= self.max_retries
+                ):
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code == 429:
+                self.limiter.slow_down()
+            elif response.ok:
+                self.limiter.speed_up()
+
+            if (
+                not replayable
+                or attempt >= self.max_retries
+                or not is_retryable(request.method, response.status_code)
+            ):
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                if retry_after > self.backoff_max:
+                    # not worth waiting for; let the caller decide
+                    return response
+                # the server asked every request from this client to wait
+                self.limiter.pause(retry_after)
+            else:
+                time.sleep(self._backoff(attempt))
+
+            response.close()
+            attempt += 1
+
+    def close(self) -> None:
+        self.adapter.close()
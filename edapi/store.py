@@ -0,0 +1,291 @@
+"""
+Local SQLite store for threads, comments and users, with incremental course sync.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import TYPE_CHECKING, Optional, TypedDict
+
+from .types import EdError
+
+if TYPE_CHECKING:
+    from .edapi import EdAPI
+    from .types.api_types.thread import (
+        API_Thread_Comment,
+        API_Thread_WithComments,
+        API_Thread_WithUser,
+    )
+    from .types.api_types.user import API_User_Short
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL,
+    number INTEGER NOT NULL,
+    updated_at TEXT,
+    reply_count INTEGER,
+    -- change signature of the thread when its comments were last fetched
+    comments_updated_at TEXT,
+    comments_reply_count INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_course ON threads (course_id, number);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    thread_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    kind TEXT NOT NULL,  -- "answer" or "comment"
+    position INTEGER NOT NULL,  -- position among its siblings
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comments_thread ON comments (thread_id);
+
+CREATE TABLE IF NOT EXISTS users (
+    course_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (course_id, id)
+);
+"""
+
+
+class SyncResult(TypedDict):
+    """
+    Summary of a `ThreadStore.sync` call.
+    """
+
+    threads_listed: int  # threads retrieved through list_threads
+    threads_changed: int  # new or updated threads
+    threads_refetched: int  # threads whose comments were retrieved again
+    errors: list[EdError]  # errors when retrieving individual threads
+
+
+class ThreadStore:
+    """
+    Local SQLite store for threads, comments and users.
+
+    Threads are stored as returned by `EdAPI.list_threads`, and comment trees
+    as returned by `EdAPI.get_thread`; `sync` keeps a course up to date
+    while retrieving as little as possible.
+
+    The store can be used as a context manager, closing the database on exit.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> "ThreadStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the underlying database connection.
+        """
+        self.connection.close()
+
+    def sync(
+        self, ed: EdAPI, course_id: int, *, max_workers: Optional[int] = None
+    ) -> SyncResult:
+        """
+        Bring the stored threads of a course up to date.
+
+        Threads are listed newest first (`sort="new"`) until the first unpinned thread
+        whose `updated_at` and `reply_count` are unchanged from the stored copy;
+        comment trees are then retrieved again only for threads that changed
+        (or whose comments failed to be retrieved in a previous sync).
+
+        If `max_workers` is given, it is passed along to `EdAPI.get_threads`.
+        """
+        threads_listed = 0
+        threads_changed = 0
+
+        def is_unchanged(thread: API_Thread_WithUser) -> bool:
+            row = self.connection.execute(
+                "SELECT updated_at, reply_count FROM threads WHERE id = ?",
+                (thread["id"],),
+            ).fetchone()
+            return row == (thread["updated_at"], thread["reply_count"])
+
+        def is_last_changed(thread: API_Thread_WithUser) -> bool:
+            # pinned threads are listed first regardless of activity
+            return not thread["is_pinned"] and is_unchanged(thread)
+
+        with self.connection:
+            for thread in ed.iter_threads(course_id, sort="new", stop=is_last_changed):
+                threads_listed += 1
+                if thread["is_pinned"] and is_unchanged(thread):
+                    continue
+                threads_changed += 1
+                self._save_thread(thread)
+
+        stale_ids = [
+            thread_id
+            for (thread_id,) in self.connection.execute(
+                "SELECT id FROM threads WHERE course_id = ? AND ("
+                " comments_updated_at IS NOT updated_at"
+                " OR comments_reply_count IS NOT reply_count)",
+                (course_id,),
+            )
+        ]
+
+        bulk_kwargs = {} if max_workers is None else {"max_workers": max_workers}
+        threads_refetched = 0
+        errors: list[EdError] = []
+        for _, result in ed.get_threads(stale_ids, ordered=False, **bulk_kwargs):
+            if isinstance(result, EdError):
+                errors.append(result)
+                continue
+            with self.connection:
+                self._save_comments(result)
+            threads_refetched += 1
+
+        return {
+            "threads_listed": threads_listed,
+            "threads_changed": threads_changed,
+            "threads_refetched": threads_refetched,
+            "errors": errors,
+        }
+
+    def _save_thread(self, thread: API_Thread_WithUser) -> None:
+        """
+        Insert or update a thread from a thread listing, along with its user.
+        """
+        self.connection.execute(
+            "INSERT INTO threads (id, course_id, number, updated_at, reply_count, data)"
+            " VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (id) DO UPDATE SET"
+            " course_id = excluded.course_id, number = excluded.number,"
+            " updated_at = excluded.updated_at, reply_count = excluded.reply_count,"
+            " data = excluded.data",
+            (
+                thread["id"],
+                thread["course_id"],
+                thread["number"],
+                thread["updated_at"],
+                thread["reply_count"],
+                json.dumps(thread),
+            ),
+        )
+
+        user = thread.get("user")
+        if user is not None:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO users (course_id, id, data) VALUES (?, ?, ?)",
+                (thread["course_id"], user["id"], json.dumps(user)),
+            )
+
+    def _save_comments(self, thread: API_Thread_WithComments) -> None:
+        """
+        Replace the stored comments of a thread with its current comment tree.
+        """
+        thread_id = thread["id"]
+        self.connection.execute(
+            "DELETE FROM comments WHERE thread_id = ?", (thread_id,)
+        )
+
+        rows = []
+        stack = [
+            (comment, kind, position)
+            for kind, key in (("answer", "answers"), ("comment", "comments"))
+            for position, comment in enumerate(thread[key])
+        ]
+        while stack:
+            comment, kind, position = stack.pop()
+            replies = comment["comments"]
+            stored = {key: val for key, val in comment.items() if key != "comments"}
+            rows.append(
+                (
+                    comment["id"],
+                    thread_id,
+                    comment["parent_id"],
+                    kind,
+                    position,
+                    json.dumps(stored),
+                )
+            )
+            stack.extend(
+                (reply, kind, reply_position)
+                for reply_position, reply in enumerate(replies)
+            )
+
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO comments"
+            " (id, thread_id, parent_id, kind, position, data)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self.connection.execute(
+            "UPDATE threads SET comments_updated_at = ?, comments_reply_count = ?"
+            " WHERE id = ?",
+            (thread["updated_at"], thread["reply_count"], thread_id),
+        )
+
+    def list_threads(self, course_id: int) -> list[API_Thread_WithUser]:
+        """
+        Retrieve all stored threads in a course, most recently updated first.
+        """
+        return [
+            json.loads(data)
+            for (data,) in self.connection.execute(
+                "SELECT data FROM threads WHERE course_id = ?"
+                " ORDER BY updated_at DESC, id DESC",
+                (course_id,),
+            )
+        ]
+
+    def get_thread(self, thread_id: int) -> Optional[API_Thread_WithComments]:
+        """
+        Retrieve a stored thread along with its comment tree,
+        in the same shape as `EdAPI.get_thread`.
+
+        Returns None if the thread is not stored.
+        """
+        row = self.connection.execute(
+            "SELECT data FROM threads WHERE id = ?", (thread_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        thread = json.loads(row[0])
+        thread.pop("user", None)  # not included in thread details
+        thread["answers"] = []
+        thread["comments"] = []
+
+        comments: dict[int, API_Thread_Comment] = {}
+        parents: list[tuple[Optional[int], str, API_Thread_Comment]] = []
+        for parent_id, kind, data in self.connection.execute(
+            "SELECT parent_id, kind, data FROM comments WHERE thread_id = ?"
+            " ORDER BY position",
+            (thread_id,),
+        ):
+            comment = json.loads(data)
+            comment["comments"] = []
+            comments[comment["id"]] = comment
+            parents.append((parent_id, kind, comment))
+
+        for parent_id, kind, comment in parents:
+            parent = comments.get(parent_id) if parent_id is not None else None
+            if parent is not None:
+                parent["comments"].append(comment)
+            else:
+                thread["answers" if kind == "answer" else "comments"].append(comment)
+
+        return thread
+
+    def list_users(self, course_id: int) -> list[API_User_Short]:
+        """
+        Retrieve all stored users in a course.
+        """
+        return [
+            json.loads(data)
+            for (data,) in self.connection.execute(
+                "SELECT data FROM users WHERE course_id = ?", (course_id,)
+            )
+        ]
@@ -0,0 +1,228 @@
+"""
+Incremental splitting of JSON documents into the items of their arrays,
+for processing large responses one item at a time as they are received.
+"""
+
+import json
+import re
+from typing import Iterable, Iterator, Optional
+
+# path of an array in a document, as the keys of the objects enclosing it,
+# e.g. ("thread", "comments") for `{"thread": {"comments": [...]}}`
+JSONPath = tuple[str, ...]
+
+# body of a string, up to its closing quote or the end of the buffer; matched
+# atomically (through a lookahead and a backreference), so that incomplete strings
+# are not backtracked through
+_STRING_BODY = rb'(?=([^"\\]*(?:\\.[^"\\]*)*))\1'
+# strings (with group 2 matching the closing quote, if the string is complete)
+# and characters that open or close values, or separate them
+_TOKEN = re.compile(rb'"' + _STRING_BODY + rb'(")?|[{}\[\],]', re.DOTALL)
+# everything up to the next bracket or incomplete string, inside items
+_ITEM_SKIP = re.compile(rb'(?:[^"{}\[\]]+|"' + _STRING_BODY + rb'")*', re.DOTALL)
+
+
+def _find_string_end(buffer: bytearray, position: int) -> int:
+    """
+    Find the position after the closing quote of the string containing `position`,
+    or -1 if the string doesn't end in the buffer.
+    """
+    while True:
+        quote = buffer.find(b'"', position)
+        if quote < 0:
+            return -1
+        # the quote is escaped if it follows an odd number of backslashes
+        start = quote
+        while start > 0 and buffer[start - 1] == 0x5C:
+            start -= 1
+        if (quote - start) % 2 == 0:
+            return quote + 1
+        position = quote + 1
+
+
+class JSONItemSplitter:
+    """
+    Splits a JSON document, fed in chunks of bytes, into the raw items
+    of the arrays at the given paths, without decoding anything else.
+
+    Only the current item and the current chunk are kept in memory,
+    so documents of any size can be split; items are returned as the bytes
+    of their JSON encoding, to be decoded one by one.
+    Arrays nested in the items of another array are not split.
+    The document is assumed to be valid JSON; malformed documents give
+    unspecified results.
+    """
+
+    def __init__(self, paths: Iterable[JSONPath]):
+        self.paths = frozenset(paths)
+
+        self._buffer = bytearray()
+        # position of the next byte to scan in the buffer
+        self._position = 0
+        # path of each open container (None keys for array items), outermost first
+        self._containers: list[Optional[tuple[Optional[str], ...]]] = []
+        self._is_object: list[bool] = []
+        # last key read in the innermost object
+        self._key: Optional[str] = None
+        self._expect_key = False
+
+        self._in_string = False
+        self._string_start = 0
+
+        # depth of the array being split, and its path
+        self._split_depth = -1
+        self._split_path: Optional[JSONPath] = None
+        # start of the current item in the buffer
+        self._item_start = 0
+
+    def _emit(self, end: int) -> Optional[tuple[JSONPath, bytes]]:
+        """
+        Return the item ending at `end`, or None if there is none (an empty array).
+        """
+        item = bytes(self._buffer[self._item_start : end]).strip()
+        if not item:
+            return None
+        return self._split_path, item
+
+    def _read_key(self, end: int) -> None:
+        """
+        Read the key of the innermost object, from the string ending at `end`.
+        """
+        key = bytes(self._buffer[self._string_start + 1 : end - 1]).decode()
+        if "\\" in key:
+            key = json.loads(self._buffer[self._string_start : end])
+        self._key = key
+        self._expect_key = False
+
+    def feed(self, chunk: bytes) -> list[tuple[JSONPath, bytes]]:
+        """
+        Scan the next chunk of the document, returning the `(path, item)` pairs
+        of the items completed in it.
+        """
+        buffer = self._buffer
+        buffer += chunk
+        items = []
+        position = self._position
+        containers = self._containers
+        is_object = self._is_object
+        token = _TOKEN.search
+        item_skip = _ITEM_SKIP.match
+
+        while True:
+            if self._in_string:
+                end = _find_string_end(buffer, position)
+                if end < 0:
+                    # keep trailing backslashes, which may escape the next quote
+                    end = len(buffer)
+                    while end > position and buffer[end - 1] == 0x5C:
+                        end -= 1
+                    position = end
+                    break
+                position = end
+                self._in_string = False
+                if self._expect_key:
+                    self._read_key(position)
+                continue
+
+            if len(containers) > self._split_depth >= 0:
+                # inside an item, only brackets matter
+                position = item_skip(buffer, position).end()
+                if position >= len(buffer):
+                    break
+                char = buffer[position]
+                if char == 0x22:  # quote; the rest of the string is in the next chunks
+                    self._in_string = True
+                    self._string_start = position
+                elif char in (0x7B, 0x5B):  # { or [
+                    containers.append(None)
+                    is_object.append(char == 0x7B)
+                else:  # } or ]
+                    containers.pop()
+                    is_object.pop()
+                position += 1
+                continue
+
+            match = token(buffer, position)
+            if match is None:
+                position = len(buffer)
+                break
+            char = buffer[match.start()]
+            position = match.end()
+
+            if char == 0x22:  # quote
+                self._string_start = match.start()
+                if match.group(2) is None:
+                    # the rest of the string is in the next chunks
+                    self._in_string = True
+                elif self._expect_key:
+                    self._read_key(position)
+            elif char in (0x7B, 0x5B):  # { or [
+                if not containers:
+                    path: Optional[tuple[Optional[str], ...]] = ()
+                elif len(containers) == self._split_depth:
+                    # start of an item; paths inside items don't matter
+                    path = None
+                elif is_object[-1]:
+                    path = containers[-1] + (self._key,)
+                else:
+                    path = containers[-1] + (None,)
+                containers.append(path)
+                is_object.append(char == 0x7B)
+                self._expect_key = char == 0x7B and path is not None
+                if char == 0x5B and self._split_depth < 0 and path in self.paths:
+                    self._split_depth = len(containers)
+                    self._split_path = path
+                    self._item_start = position
+            elif char == 0x2C:  # comma
+                if is_object[-1]:
+                    self._expect_key = True
+                elif len(containers) == self._split_depth:
+                    item = self._emit(match.start())
+                    if item is not None:
+                        items.append(item)
+                    self._item_start = position
+            else:  # } or ]
+                if len(containers) == self._split_depth:
+                    item = self._emit(match.start())
+                    if item is not None:
+                        items.append(item)
+                    self._split_depth = -1
+                    self._split_path = None
+                containers.pop()
+                is_object.pop()
+                self._expect_key = False
+
+        # drop the scanned bytes that are no longer needed
+        keep = position
+        if self._in_string and self._expect_key:
+            keep = min(keep, self._string_start)
+        if self._split_depth >= 0:
+            keep = min(keep, self._item_start)
+        del buffer[:keep]
+        self._position = position - keep
+        self._string_start -= keep
+        self._item_start -= keep
+        return items
+
+    def close(self) -> None:
+        """
+        Check that the whole document was fed; raises ValueError otherwise.
+        """
+        if self._containers or self._in_string:
+            raise ValueError("JSON document is truncated")
+
+
+def iter_json_items(
+    chunks: Iterable[bytes], paths: Iterable[JSONPath]
+) -> Iterator[tuple[JSONPath, bytes]]:
+    """
+    Yield the `(path, item)` pairs of the items of the arrays at the given paths
+    in a JSON document given in chunks, as each item is completed;
+    see `JSONItemSplitter`.
+
+    Raises ValueError if the document ends before all arrays are closed.
+    """
+    splitter = JSONItemSplitter(paths)
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    splitter.close()
@@ -38,7 +38,7 @@ class API_User_Short(TypedDict):
     Abbreviated user type.
     """
 
-    avatar: str
+    avatar: Optional[str]
     course_role: str
     id: int
     name: str
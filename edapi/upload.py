@@ -0,0 +1,249 @@
+"""
+Streaming multipart bodies for uploading files to Ed without loading them into memory.
+"""
+
+import hashlib
+import json
+import mimetypes
+import mmap
+import os
+import threading
+import uuid
+from typing import BinaryIO, Callable, Iterator, Optional, Union
+
+# size of the chunks read from the file while sending
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# called with (bytes sent so far, total bytes) as the body is read
+ProgressCallback = Callable[[int, int], None]
+
+FileSource = Union[str, "os.PathLike[str]", BinaryIO]
+
+
+def guess_content_type(filename: str) -> str:
+    """
+    Guess the MIME type of a file from its name.
+    """
+    content_type, _ = mimetypes.guess_type(filename)
+    return content_type or "application/octet-stream"
+
+
+class MultipartStream:
+    """
+    File-like `multipart/form-data` body with a single file field,
+    read in chunks straight from the file.
+
+    The file is memory-mapped if possible, and read through `fileobj.read` otherwise;
+    either way, only one chunk of the file is held in memory at a time.
+    The file object must be seekable, so that the total length
+    (sent as `Content-Length`) is known up front.
+
+    If given, `progress` is called with the number of bytes read so far
+    and the total number of bytes, after each read.
+    """
+
+    def __init__(
+        self,
+        field: str,
+        filename: str,
+        fileobj: BinaryIO,
+        content_type: str,
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        progress: Optional[ProgressCallback] = None,
+    ):
+        if not fileobj.seekable():
+            raise ValueError("file must be seekable")
+
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.progress = progress
+
+        self._file = fileobj
+        self._file_start = fileobj.tell()
+        self._file_size = fileobj.seek(0, os.SEEK_END) - self._file_start
+        fileobj.seek(self._file_start)
+
+        escaped_filename = filename.replace("\\", "\\\\").replace('"', '\\"')
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}";'
+            f' filename="{escaped_filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self._length = len(self._head) + self._file_size + len(self._tail)
+
+        self._mmap = self._map_file()
+        self._position = 0
+
+    def _map_file(self) -> Optional[mmap.mmap]:
+        """
+        Memory-map the file, or return None if it can't be mapped.
+        """
+        if self._file_size == 0:
+            return None
+        try:
+            fileno = self._file.fileno()
+            return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    @property
+    def content_type(self) -> str:
+        """
+        Value of the `Content-Type` header for this body.
+        """
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def _read_file(self, offset: int, size: int) -> bytes:
+        """
+        Read `size` bytes of the file, starting at `offset` from the start of the file.
+        """
+        start = self._file_start + offset
+        if self._mmap is not None:
+            return self._mmap[start : start + size]
+        self._file.seek(start)
+        return self._file.read(size)
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        """
+        Read up to `size` bytes of the body (at most one chunk if `size` is negative).
+        """
+        if size is None or size < 0:
+            size = self.chunk_size
+        size = min(size, self._length - self._position)
+        if size <= 0:
+            return b""
+
+        parts = []
+        remaining = size
+        # (offset of the part in the body, part length, reader)
+        for part_start, part_length, read_part in (
+            (0, len(self._head), lambda offset, n: self._head[offset : offset + n]),
+            (len(self._head), self._file_size, self._read_file),
+            (
+                len(self._head) + self._file_size,
+                len(self._tail),
+                lambda offset, n: self._tail[offset : offset + n],
+            ),
+        ):
+            offset = self._position - part_start
+            if remaining == 0 or offset >= part_length:
+                continue
+            data = read_part(offset, min(remaining, part_length - offset))
+            if not data:
+                raise OSError("file was truncated while uploading")
+            parts.append(data)
+            self._position += len(data)
+            remaining -= len(data)
+
+        if self.progress is not None:
+            self.progress(self._position, self._length)
+        return b"".join(parts)
+
+    def close(self) -> None:
+        """
+        Release the memory map of the file; the file itself is left open.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def open_file_source(
+    file: FileSource, filename: Optional[str] = None
+) -> tuple[BinaryIO, str, bool]:
+    """
+    Open a path or pass through a file object, returning `(fileobj, filename, owned)`;
+    `owned` is True if the file was opened here, and should be closed by the caller.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        path = os.fspath(file)
+        return open(path, "rb"), filename or os.path.basename(path), True
+
+    if filename is None:
+        name = getattr(file, "name", None)
+        if not isinstance(name, str):
+            raise ValueError("filename is required for file objects without a name")
+        filename = os.path.basename(name)
+    return file, filename, False
+
+
+def file_digest(file: FileSource, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """
+    SHA-256 hex digest of the contents of a path or a (seekable) binary file object,
+    read in chunks; file objects are left at their original position.
+    """
+    digest = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as fileobj:
+            for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    start = file.tell()
+    try:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    finally:
+        file.seek(start)
+    return digest.hexdigest()
+
+
+class UploadIndex:
+    """
+    Thread-safe map from content hashes (see `file_digest`) to the static URLs
+    of files that were already uploaded.
+
+    If `path` is given, the map is loaded from, and every new entry appended to,
+    a JSON lines file at that path, so it persists across runs;
+    lines that can't be parsed (e.g. cut off by a crash) are skipped.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._urls: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        if path is None:
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as index_file:
+                for line in index_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._urls[record["sha256"]] = record["url"]
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def get(self, digest: str) -> Optional[str]:
+        """
+        Static URL of the uploaded file with the given content hash, if any.
+        """
+        return self._urls.get(digest)
+
+    def add(self, digest: str, url: str) -> None:
+        """
+        Record the static URL of an uploaded file with the given content hash.
+        """
+        with self._lock:
+            self._urls[digest] = url
+            if self.path is not None:
+                with open(self.path, "a", encoding="utf-8") as index_file:
+                    index_file.write(json.dumps({"sha256": digest, "url": url}) + "\n")
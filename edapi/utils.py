@@ -2,7 +2,20 @@
 Various utility functions for the Ed API.
 """
 
-from bs4 import BeautifulSoup, Tag
+from __future__ import annotations
+
+import io
+from typing import TYPE_CHECKING, Iterator, Literal, Union, overload
+
+# parsers are only imported when a document is created or parsed
+if TYPE_CHECKING:
+    import xml.etree.ElementTree as ET
+
+    import lxml.etree
+    from bs4 import BeautifulSoup, Tag
+
+# parser backends for `parse_content`
+ParserBackend = Literal["bs4", "lxml", "etree"]
 
 
 def new_document() -> tuple[BeautifulSoup, Tag]:
@@ -12,18 +25,87 @@ def new_document() -> tuple[BeautifulSoup, Tag]:
     Returns the tuple (soup, root), where `soup` is the BeautifulSoup instance,
     and `root` is the root tag.
     """
+    from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+
     soup = BeautifulSoup('<document version="2.0"></document>', "xml")
     assert soup.document is not None  # type coercion
     return (soup, soup.document)
 
 
-def parse_content(content: str) -> tuple[BeautifulSoup, Tag]:
+@overload
+def parse_content(
+    content: str, backend: Literal["bs4"] = "bs4"
+) -> tuple[BeautifulSoup, Tag]: ...
+
+
+@overload
+def parse_content(
+    content: str, backend: Literal["lxml"]
+) -> tuple[lxml.etree._ElementTree, lxml.etree._Element]: ...
+
+
+@overload
+def parse_content(
+    content: str, backend: Literal["etree"]
+) -> tuple[ET.ElementTree, ET.Element]: ...
+
+
+def parse_content(content: str, backend: ParserBackend = "bs4"):
     """
-    Parses the content and returns a BeautifulSoup instance.
+    Parses the content and returns a BeautifulSoup instance,
+    or an element tree with another parser `backend`.
 
-    Returns the tuple (soup, root), where `soup` is the BeautifulSoup instance,
-    and `root` is the root tag.
+    Returns the tuple (tree, root), where `root` is the root tag, and `tree` is:
+    - "bs4" (default): the BeautifulSoup instance
+    - "lxml": an `lxml.etree` element tree, several times faster to parse
+    - "etree": an `xml.etree.ElementTree` element tree, without extra dependencies
     """
-    soup = BeautifulSoup(content, "xml")
-    assert soup.document is not None  # type coercion
-    return (soup, soup.document)
+    if backend == "bs4":
+        from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+
+        soup = BeautifulSoup(content, "xml")
+        assert soup.document is not None  # type coercion
+        return (soup, soup.document)
+
+    if backend == "lxml":
+        from lxml import etree  # pylint: disable=import-outside-toplevel
+
+        parser = etree.XMLParser(resolve_entities=False, no_network=True)
+        root = etree.fromstring(content.encode(), parser)
+        return (root.getroottree(), root)
+
+    if backend == "etree":
+        import xml.etree.ElementTree as ET  # pylint: disable=import-outside-toplevel
+
+        root = ET.fromstring(content)
+        return (ET.ElementTree(root), root)
+
+    raise ValueError(f"Unknown parser backend {backend!r}")
+
+
+def iterparse_content(
+    content: str,
+    events: tuple[str, ...] = ("end",),
+    backend: Literal["lxml", "etree"] = "etree",
+) -> Iterator[tuple[str, Union[lxml.etree._Element, ET.Element]]]:
+    """
+    Parses the content incrementally, yielding (event, element) pairs
+    for read-only scans; see `xml.etree.ElementTree.iterparse`.
+
+    Elements are complete on their "end" event; they can be cleared
+    (`element.clear()`) once processed, so memory use stays low for large documents.
+    """
+    source = io.BytesIO(content.encode())
+    if backend == "lxml":
+        from lxml import etree  # pylint: disable=import-outside-toplevel
+
+        return etree.iterparse(
+            source, events=events, resolve_entities=False, no_network=True
+        )
+
+    if backend == "etree":
+        import xml.etree.ElementTree as ET  # pylint: disable=import-outside-toplevel
+
+        return ET.iterparse(source, events=events)
+
+    raise ValueError(f"Unknown parser backend {backend!r}")
@@ -10,10 +10,13 @@ Homework templates are also posted with each homework, by uploading a zip file t
 and prompting the user to finalize the new Overleaf project.
 This Overleaf view link is included in a separate post for students.
 
+Several homeworks, discussions or notes can be posted in one run; the index post
+is then edited once, with all the new entries.
+
 Usage:
-    post_threads.py hw <num>
-    post_threads.py dis <num> [--summer]
-    post_threads.py note <num>
+    post_threads.py hw <num>...
+    post_threads.py dis <num>... [--summer]
+    post_threads.py note <num>...
     post_threads.py init-index
 
 Requirements:
@@ -24,6 +27,7 @@ Requirements:
         ED_API_KEY: ed api key
 """
 
+import functools
 import json
 import os
 from dataclasses import dataclass
@@ -31,8 +35,10 @@ from typing import Optional
 
 from edapi import EdAPI
 from edapi.constants import ThreadType
-from edapi.utils import new_document, parse_content
-from PIL import Image
+from edapi.document import DocumentBuilder, append_child
+from edapi.edit_session import ThreadEditSession
+from edapi.types import EdError, PostThreadParams
+from edapi.utils import new_document
 
 OVERLEAF_UPLOAD_URL = "https://www.overleaf.com/docs?snip_uri="
 ANSI_BLUE = lambda text: f"\u001b[34m{text}\u001b[0m"
@@ -86,15 +92,30 @@ def get_hw_template_zip(hw_num: str):
     return f"../rendered/hw{hw_num}/raw/hw{hw_num}-template.zip"
 
 
+def get_hw_post_journal(hw_num: str):
+    """Compute the path to the journal of posted homework threads."""
+    return f"../rendered/hw{hw_num}/posted.jsonl"
+
+
 # ========== Ed post helpers ==========
 
 
-def post_hw(ed: EdAPI, config: Config, hw_num: str):
+def open_index(ed: EdAPI, config: Config) -> ThreadEditSession:
     """
-    Post homework question threads and update the homework/discussion index.
+    Start an edit session on the index thread, queueing the new index entries
+    so that they are written in a single edit.
     """
     assert config.index_thread_num is not None, "Index thread number must be provided."
 
+    index_thread = ed.get_course_thread(config.course_id, config.index_thread_num)
+    return ed.edit_session(index_thread["id"], thread=index_thread)
+
+
+def post_hw(ed: EdAPI, config: Config, index: ThreadEditSession, hw_num: str):
+    """
+    Post homework question threads and update the homework/discussion index.
+    """
+
     summary = []
     hw_num_fmt = str(int(hw_num))
     base_path = get_hw_folder(hw_num)
@@ -109,46 +130,55 @@ def post_hw(ed: EdAPI, config: Config, hw_num: str):
     hw_imgs.sort(key=lambda x: int(x.split(".")[0].split("-")[1][3:]), reverse=True)
     num_imgs = len(hw_imgs)
 
-    for hw_idx, hw_img in enumerate(hw_imgs, 1):
-        with open(base_path + hw_img, "rb") as f:
-            curr_img = f.read()
+    journal_path = get_hw_post_journal(hw_num)
 
-        # upload image to ed
-        img_url = ed.upload_file(hw_img, curr_img, "image/png")
-        print(f"[{hw_idx}/{num_imgs}] Uploaded {hw_img}: {img_url}")
+    def problem_thread(hw_img: str, problem_num: str) -> PostThreadParams:
+        # upload image to ed; the image size is read from the file header
+        figure = ed.upload_image(base_path + hw_img)
+        print(f"Uploaded {hw_img}")
 
-        # get image dimensions for display
-        img = Image.open(base_path + hw_img)
-        img_width, img_height = img.size
+        # create post body
+        document = f'<document version="2.0">{figure}</document>'
 
+        return {
+            "type": ThreadType.POST,
+            "title": f"Homework {hw_num_fmt} Problem {problem_num} Thread",
+            "category": "Homework",
+            "subcategory": f"HW{hw_num_fmt}",
+            "subsubcategory": "",
+            "content": document,
+            "is_pinned": False,
+            "is_private": False,
+            "is_anonymous": False,
+            "is_megathread": True,
+            "anonymous_comments": True,
+        }
+
+    problem_threads = []
+    for hw_img in hw_imgs:
         # hw_img has format hw<hw #>-img<problem #>.png
         problem_num = hw_img.split(".")[0][-1]
-
-        # create post body
-        problem_soup, document = new_document()
-        problem_figure = problem_soup.new_tag("figure")
-        problem_image = problem_soup.new_tag(
-            "image", src=img_url, width=img_width, height=img_height
-        )
-        problem_figure.append(problem_image)
-        document.append(problem_figure)
-
-        result = ed.post_thread(
-            config.course_id,
-            {
-                "type": ThreadType.POST,
-                "title": f"Homework {hw_num_fmt} Problem {problem_num} Thread",
-                "category": "Homework",
-                "subcategory": f"HW{hw_num_fmt}",
-                "subsubcategory": "",
-                "content": str(document),
-                "is_pinned": False,
-                "is_private": False,
-                "is_anonymous": False,
-                "is_megathread": True,
-                "anonymous_comments": True,
-            },
+        # images are only uploaded for threads that are actually posted
+        problem_threads.append(
+            (
+                f"hw{hw_num_fmt}-q{problem_num}",
+                functools.partial(problem_thread, hw_img, problem_num),
+            )
         )
+
+    # post all problem threads; reruns skip threads recorded in the journal.
+    # threads are posted one at a time, in reverse order of problem number,
+    # so that the first problem ends up at the top of the thread list
+    results = ed.post_threads(
+        config.course_id,
+        problem_threads,
+        journal_path=journal_path,
+        max_workers=1,
+    )
+    for hw_idx, (key, result) in enumerate(results, 1):
+        problem_num = key.split("-q")[1]
+        if isinstance(result, EdError):
+            raise result
         print(
             f"[{hw_idx}/{num_imgs}] Posted thread for HW{hw_num_fmt} Q{problem_num}:"
             f" #{result['number']}"
@@ -157,38 +187,37 @@ def post_hw(ed: EdAPI, config: Config, hw_num: str):
 
     summary.reverse()
 
-    # LaTeX Template
-    with open(get_hw_template_zip(hw_num), "rb") as f:
-        template_zip = f.read()
-    template_url = ed.upload_file(
-        f"hw{hw_num}-template.zip", template_zip, "multipart/form-data"
-    )
+    def template_thread() -> PostThreadParams:
+        # LaTeX Template
+        with open(get_hw_template_zip(hw_num), "rb") as f:
+            template_zip = f.read()
+        template_url = ed.upload_file(
+            f"hw{hw_num}-template.zip", template_zip, "multipart/form-data"
+        )
 
-    template_creation_url = OVERLEAF_UPLOAD_URL + template_url
-    print(f"\nGo to:\n\t{ANSI_BLUE(template_creation_url)}")
-    student_link = input("Enter shareable Overleaf link: ")
+        template_creation_url = OVERLEAF_UPLOAD_URL + template_url
+        print(f"\nGo to:\n\t{ANSI_BLUE(template_creation_url)}")
+        student_link = input("Enter shareable Overleaf link: ")
 
-    # create post body
-    post_soup, document = new_document()
-    link_paragraph = post_soup.new_tag("paragraph")
-    link_paragraph.string = "Overleaf link: "
-    link_link = post_soup.new_tag("link", href=student_link)
-    link_link.string = student_link
-    link_paragraph.append(link_link)
-    document.append(link_paragraph)
-
-    zip_paragraph = post_soup.new_tag("paragraph")
-    zip_paragraph.string = "Source files:"
-    document.append(zip_paragraph)
-    zip_link = post_soup.new_tag(
-        "file", url=template_url, filename=f"hw{hw_num}-template.zip"
-    )
-    zip_paragraph.append(zip_link)
-    document.append(zip_link)
+        # create post body
+        post_soup, document = new_document()
+        link_paragraph = post_soup.new_tag("paragraph")
+        link_paragraph.string = "Overleaf link: "
+        link_link = post_soup.new_tag("link", href=student_link)
+        link_link.string = student_link
+        link_paragraph.append(link_link)
+        document.append(link_paragraph)
+
+        zip_paragraph = post_soup.new_tag("paragraph")
+        zip_paragraph.string = "Source files:"
+        document.append(zip_paragraph)
+        zip_link = post_soup.new_tag(
+            "file", url=template_url, filename=f"hw{hw_num}-template.zip"
+        )
+        zip_paragraph.append(zip_link)
+        document.append(zip_link)
 
-    template_result = ed.post_thread(
-        config.course_id,
-        {
+        return {
             "type": ThreadType.POST,
             "title": f"LaTeX Template for HW {hw_num_fmt}",
             "category": "Homework",
@@ -200,49 +229,38 @@ def post_hw(ed: EdAPI, config: Config, hw_num: str):
             "is_anonymous": False,
             "is_megathread": True,
             "anonymous_comments": True,
-        },
+        }
+
+    # the template is recorded in the same journal, so reruns skip it as well
+    ((_, template_result),) = ed.post_threads(
+        config.course_id,
+        [(f"hw{hw_num_fmt}-template", template_thread)],
+        journal_path=journal_path,
     )
+    if isinstance(template_result, EdError):
+        raise template_result
     print(f"Posted template for HW{hw_num_fmt}: #{template_result['number']}")
     summary.append(f"LaTeX Template (#{template_result['number']})")
 
     # Update summary
+    hw_summary = DocumentBuilder(fragment=True)
+    with hw_summary.list_item():
+        hw_summary.paragraph(f"Homework {hw_num_fmt}")
+        with hw_summary.list("bullet"):
+            for question_content in summary:
+                hw_summary.list_item(question_content)
 
-    course_id = config.course_id
-    hw_dis_post_num = config.index_thread_num
-    hw_dis_post = ed.get_course_thread(course_id, hw_dis_post_num)
-    hw_dis_post_id = hw_dis_post["id"]
-
-    last_content = hw_dis_post["content"]
-    soup, document = parse_content(last_content)
     # hw list is first, dis list is second
-    hw_list = document.find_all("list", recursive=False)[0]
-
-    hw_summary = soup.new_tag("list-item")
-    hw_summary_heading = soup.new_tag("paragraph")
-    hw_summary_heading.string = f"Homework {hw_num_fmt}"
-    hw_summary.append(hw_summary_heading)
-
-    question_list = soup.new_tag("list")
-    question_list.attrs["style"] = "bullet"
-    for question_content in summary:
-        question_item = soup.new_tag("list-item")
-        question_paragraph = soup.new_tag("paragraph")
-        question_paragraph.append(question_content)
-        question_item.append(question_paragraph)
-        question_list.append(question_item)
-    hw_summary.append(question_list)
-
-    hw_list.append(hw_summary)
+    hw_item = hw_summary.build()
+    index.mutate_content(lambda content: append_child(content, "list[0]", hw_item))
 
-    ed.edit_thread(hw_dis_post_id, {"content": str(document)})
-    print("Updated Index Thread")
 
-
-def post_dis(ed: EdAPI, config: Config, dis_num: str, is_summer: bool):
+def post_dis(
+    ed: EdAPI, config: Config, index: ThreadEditSession, dis_num: str, is_summer: bool
+):
     """
     Post discussion thread and update the homework/discussion index.
     """
-    assert config.index_thread_num is not None, "Index thread number must be provided."
 
     dis_num_fmt = int(dis_num)
 
@@ -304,38 +322,26 @@ def post_dis(ed: EdAPI, config: Config, dis_num: str, is_summer: bool):
         print(f"Posted discussion {dis_num_fmt}a/b: #{dis_post_result['number']}")
 
     # update summary
-    hw_dis_post_num = config.index_thread_num
-    hw_dis_post = ed.get_course_thread(config.course_id, hw_dis_post_num)
-    hw_dis_post_id = hw_dis_post["id"]
-
-    last_content = hw_dis_post["content"]
-    soup, document = parse_content(last_content)
-    # hw list is first, dis list is second
-    dis_list = document.find_all("list", recursive=False)[1]
-
-    dis_item = soup.new_tag("list-item")
-    dis_item_paragraph = soup.new_tag("paragraph")
+    dis_item = DocumentBuilder(fragment=True)
     if is_summer:
-        dis_item_paragraph.string = (
+        dis_item.list_item(
             f"Discussion {dis_num_fmt}a, {dis_num_fmt}b, {dis_num_fmt}c, {dis_num_fmt}d"
             f" (#{dis_post_result['number']})"
         )
     else:
-        dis_item_paragraph.string = (
+        dis_item.list_item(
             f"Discussion {dis_num_fmt}a, {dis_num_fmt}b (#{dis_post_result['number']})"
         )
-    dis_item.append(dis_item_paragraph)
-    dis_list.append(dis_item)
 
-    ed.edit_thread(hw_dis_post_id, {"content": str(document)})
-    print("Updated Index Thread")
+    # hw list is first, dis list is second
+    dis_fragment = dis_item.build()
+    index.mutate_content(lambda content: append_child(content, "list[1]", dis_fragment))
 
 
-def post_note(ed: EdAPI, config: Config, note_num: str):
+def post_note(ed: EdAPI, config: Config, index: ThreadEditSession, note_num: str):
     """
     Post note thread and update the homework/discussion index.
     """
-    assert config.index_thread_num is not None, "Index thread number must be provided."
 
     # create post body
     note_soup, document = new_document()
@@ -376,23 +382,14 @@ def post_note(ed: EdAPI, config: Config, note_num: str):
     print(f"Posted note {note_num} thread: #{note_post_result['number']}")
 
     # update summary
-    hw_dis_post_num = config.index_thread_num
-    hw_dis_post = ed.get_course_thread(config.course_id, hw_dis_post_num)
-    hw_dis_post_id = hw_dis_post["id"]
+    note_item = DocumentBuilder(fragment=True)
+    note_item.list_item(f"Note {note_num} (#{note_post_result['number']})")
 
-    last_content = hw_dis_post["content"]
-    soup, document = parse_content(last_content)
     # hw list is first, dis list is second, note list is third
-    note_list = document.find_all("list", recursive=False)[2]
-
-    note_item = soup.new_tag("list-item")
-    note_item_paragraph = soup.new_tag("paragraph")
-    note_item_paragraph.string = f"Note {note_num} (#{note_post_result['number']})"
-    note_item.append(note_item_paragraph)
-    note_list.append(note_item)
-
-    ed.edit_thread(hw_dis_post_id, {"content": str(document)})
-    print("Updated Index Thread")
+    note_fragment = note_item.build()
+    index.mutate_content(
+        lambda content: append_child(content, "list[2]", note_fragment)
+    )
 
 
 def init_index(ed: EdAPI, config: Config):
@@ -464,14 +461,23 @@ def main(args):
     ed = EdAPI()
     ed.login()
 
-    if args.type == "hw":
-        post_hw(ed, config, args.num)
-    elif args.type == "dis":
-        post_dis(ed, config, args.num, args.summer)
-    elif args.type == "note":
-        post_note(ed, config, args.num)
-    elif args.type == "init-index":
+    if args.type == "init-index":
         init_index(ed, config)
+        return
+
+    index = open_index(ed, config)
+    try:
+        for num in args.nums:
+            if args.type == "hw":
+                post_hw(ed, config, index, num)
+            elif args.type == "dis":
+                post_dis(ed, config, index, num, args.summer)
+            elif args.type == "note":
+                post_note(ed, config, index, num)
+    finally:
+        # add everything posted so far to the index, in a single edit
+        if index.flush() is not None:
+            print("Updated Index Thread")
 
 
 if __name__ == "__main__":
@@ -486,9 +492,9 @@ if __name__ == "__main__":
     note_parser = subparsers.add_parser("note")
     init_parser = subparsers.add_parser("init-index")
 
-    # add "num" argument to hw/dis/note parsers
+    # add "nums" argument to hw/dis/note parsers
     for p in (hw_parser, dis_parser, note_parser):
-        p.add_argument("num", help="HW/discussion/note number")
+        p.add_argument("nums", nargs="+", help="HW/discussion/note numbers")
 
     # optional summer flag for discussions
     dis_parser.add_argument(